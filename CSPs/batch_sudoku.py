@@ -0,0 +1,149 @@
+'''
+Solve a large file of sudoku puzzles with a pool of worker processes.
+
+Puzzles are read one per line, as the n*n values of the board row by row,
+with '0' or '.' for an empty square, and letters 'A', 'B', ... for values
+of 10 and above (e.g. on 16x16 boards). Solutions are written in the same
+format, one per line and in the same order as the puzzles, or as "unsolvable"
+when a puzzle has no solution, or "error: ..." when a line is not a valid
+puzzle, so that one bad puzzle does not stop the rest of the batch.
+
+The puzzle file is streamed, and at most `max_in_flight` puzzles are queued
+for the workers at once, so memory use does not grow with the size of the
+file. Solutions are written as soon as they (and all earlier ones) are ready.
+
+Usage: python batch_sudoku.py PUZZLES SOLUTIONS [PROCESSES]
+
+'''
+import math
+import multiprocessing
+import sys
+import time
+from collections import deque
+
+from sudoku import solve_sudoku
+
+
+_SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def parse_puzzle(line):
+    ''' Convert a line of a puzzle file into a board '''
+    line = line.strip()
+    n = int(round(math.sqrt(len(line))))
+    if n * n != len(line) or int(round(math.sqrt(n)))**2 != n:
+        raise ValueError("Not a sudoku puzzle: {!r}".format(line))
+    values = [0 if c in '0.' else _SYMBOLS.find(c.upper()) + 1
+              for c in line]
+    for c, v in zip(line, values):
+        if not 0 < v <= n and c not in '0.':
+            raise ValueError("Not a value of a {0}x{0} sudoku: {1!r}".format(
+                n, c))
+    return [values[i*n:(i+1)*n] for i in range(n)]
+
+
+def format_board(board):
+    ''' Convert a board into a line of a puzzle file '''
+    return ''.join('.' if v == 0 else _SYMBOLS[v-1]
+                   for row in board for v in row)
+
+
+def _solve_line(line):
+    '''
+    Solve the puzzle on `line`, returning the line to write for it and how
+    long it took to solve, or None for the time if the line is not a valid
+    puzzle. Any other error is a bug, so it is not caught here.
+    '''
+    try:
+        board = parse_puzzle(line)
+    except ValueError as e:
+        return "error: {}".format(e), None
+    start = time.time()
+    solution = solve_sudoku(board)
+    elapsed = time.time() - start
+    return (format_board(solution) if solution else "unsolvable"), elapsed
+
+
+def _percentile(sorted_values, p):
+    ''' The `p`th percentile of `sorted_values`, by the nearest rank '''
+    if not sorted_values:
+        return 0.0
+    rank = int(math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def solve_file(puzzle_path, solution_path, processes=None, max_in_flight=None):
+    '''
+    Solve every puzzle in `puzzle_path`, writing the solutions to
+    `solution_path`.
+
+    processes: number of worker processes (by default, one per cpu)
+
+    max_in_flight: maximum number of puzzles handed to the workers but not yet
+                   written (by default, 16 per process)
+
+    Returns a dict with the number of `puzzles` solved, the number of
+    `errors` (lines that were not valid puzzles), the throughput in
+    `puzzles_per_second`, and the `p50` and `p99` latencies of solving a single
+    puzzle, in seconds.
+
+    '''
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if max_in_flight is None:
+        max_in_flight = 16 * processes
+    latencies = []
+    errors = [0]
+    pool = multiprocessing.Pool(processes)
+    start = time.time()
+    try:
+        with open(puzzle_path, 'rb') as puzzles, \
+             open(solution_path, 'wb') as solutions:
+
+            def _write_next(pending):
+                solution, elapsed = pending.popleft().get()
+                solutions.write(solution + "\n")
+                if elapsed is None:
+                    errors[0] += 1
+                else:
+                    latencies.append(elapsed)
+
+            # results of the queued puzzles, in the order of the file
+            pending = deque()
+            for line in puzzles:
+                if not line.strip():
+                    continue
+                pending.append(pool.apply_async(_solve_line, (line,)))
+                if len(pending) >= max_in_flight:
+                    # wait for the oldest puzzle before reading any more
+                    _write_next(pending)
+            while pending:
+                _write_next(pending)
+    finally:
+        pool.close()
+        pool.join()
+    total = time.time() - start
+    latencies.sort()
+    return dict(puzzles=len(latencies),
+                errors=errors[0],
+                puzzles_per_second=len(latencies) / total if total else 0.0,
+                p50=_percentile(latencies, 50),
+                p99=_percentile(latencies, 99))
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print __doc__
+        sys.exit(1)
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    stats = solve_file(sys.argv[1], sys.argv[2], processes)
+    print "Solved {} puzzles ({:.1f} puzzles/second)".format(
+        stats['puzzles'], stats['puzzles_per_second'])
+    if stats['errors']:
+        print "Skipped {} invalid puzzles".format(stats['errors'])
+    print "Latency: p50 {:.2f}ms, p99 {:.2f}ms".format(
+        stats['p50'] * 1000, stats['p99'] * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+'''
+A general solver for binary Constraint Satisfaction Problems.
+
+Variables are numbered 0, 1, ..., n-1, and the domain of each variable is an
+integer bitmask, where bit `v` is set if the value `v` is still possible for
+the variable. Constraints relate pairs of variables, either as a table giving
+the supported values of one variable for every value of the other, or as the
+common special case that the two variables must take different values.
+
+The search is backtracking with pluggable heuristics for choosing the next
+variable and the order of its values, maintaining arc consistency (AC-3) after
+every assignment. Rather than returning what was pruned so that it can be
+added back in, every change to a domain is recorded on a trail, and
+backtracking simply undoes the trail back to where it was before the
+assignment.
+
+Groups of variables that must all be different (such as the rows, columns and
+subgrids of a sudoku) can also be added as a whole, which lets values with
+only one place left in a group be found as well.
+
+'''
+from collections import deque
+
+
+def _values(domain):
+    ''' Generate the values in the bitmask `domain`, in increasing order '''
+    value = 0
+    while domain:
+        if domain & 1:
+            yield value
+        domain >>= 1
+        value += 1
+
+
+def _domain_size(domain):
+    ''' The number of values in the bitmask `domain` '''
+    return bin(domain).count('1')
+
+
+class Trail:
+    '''
+    An undo log of changes to a list of integers.
+
+    Before `values[index]` is changed, `save(index, values[index])` records
+    its old value as two flat integer entries. Backtracking to an earlier
+    `mark()` then restores every value changed since, most recent first, by
+    truncating the log.
+    '''
+    def __init__(self):
+        self.entries = []
+
+    def __len__(self):
+        ''' The number of changes recorded '''
+        return len(self.entries) // 2
+
+    def save(self, index, value):
+        ''' Record that `index` had the value `value` '''
+        self.entries.append(index)
+        self.entries.append(value)
+
+    def mark(self):
+        ''' A position on the trail that can later be undone back to '''
+        return len(self.entries)
+
+    def pop(self):
+        ''' Remove the most recent change, returning `(index, value)` '''
+        value = self.entries.pop()
+        return self.entries.pop(), value
+
+    def undo(self, values, mark):
+        ''' Restore `values` to how they were at `mark` '''
+        entries = self.entries
+        for k in xrange(len(entries) - 2, mark - 2, -2):
+            values[entries[k]] = entries[k + 1]
+        del entries[mark:]
+
+
+# Heuristics for choosing the next variable to assign to. Each is called with
+# the csp and the list of unassigned variables.
+
+def first_unassigned(csp, unassigned):
+    ''' Assign to variables in order '''
+    return min(unassigned)
+
+
+def most_constrained(csp, unassigned):
+    '''
+    The Most Constrained Variable (minimum remaining values), breaking ties
+    with the Most Constraining Variable (the most unassigned neighbours)
+    '''
+    domains, assignment = csp.domains, csp.assignment
+    best, best_key = None, None
+    for x in unassigned:
+        size = _domain_size(domains[x])
+        if best is not None and size > best_key[0]:
+            continue
+        degree = sum(1 for y in csp.neighbours[x] if assignment[y] is None)
+        key = (size, -degree)
+        if best is None or key < best_key:
+            best, best_key = x, key
+    return best
+
+
+# Heuristics for ordering the values of a variable. Each is called with the
+# csp and the variable.
+
+def increasing_values(csp, x):
+    ''' Try values in increasing order '''
+    return list(_values(csp.domains[x]))
+
+
+def least_constraining_values(csp, x):
+    '''
+    Least Constraining Values: try first the values that remove the fewest
+    values from the domains of the unassigned neighbours of `x`
+    '''
+    domains, assignment = csp.domains, csp.assignment
+    n_removed = dict.fromkeys(_values(domains[x]), 0)
+    for y in csp.neighbours[x]:
+        if assignment[y] is not None:
+            continue
+        table = csp.constraints[x, y]
+        for value in n_removed:
+            if table is None:
+                # the constraint is x != y
+                if domains[y] >> value & 1:
+                    n_removed[value] += 1
+            else:
+                n_removed[value] += _domain_size(domains[y] & ~table[value])
+    return sorted(n_removed, key=lambda v: n_removed[v])
+
+
+class CSP:
+    '''
+    Args:
+        domains: the initial domain of each variable, as a bitmask of values
+
+    '''
+    def __init__(self, domains):
+        self.domains = list(domains)
+        # the value assigned to each variable, or None
+        self.assignment = [None] * len(self.domains)
+        # the variables each variable shares a constraint with
+        self.neighbours = [[] for _ in self.domains]
+        # the table of each arc (x, y): `table[a]` is the bitmask of values of
+        # y supporting the value `a` of x. None means that x != y
+        self.constraints = {}
+        # groups of variables that must all take different values, and the
+        # groups each variable is in
+        self.groups = []
+        self.variable_groups = [[] for _ in self.domains]
+        self.trail = Trail()
+
+    def __len__(self):
+        return len(self.domains)
+
+    def _add_arc(self, x, y, table):
+        '''
+        Add the arc (x, y) with `table`, or if there is already one, only allow
+        the pairs of values that both of them allow
+        '''
+        if x == y:
+            raise ValueError(
+                "Variable {} cannot be constrained with itself".format(x))
+        if (x, y) not in self.constraints:
+            self.neighbours[x].append(y)
+            self.constraints[x, y] = table
+            return
+        old = self.constraints[x, y]
+        if old is None:
+            old, table = table, old
+        if old is None:
+            # both are x != y
+            return
+        if table is None:
+            # x != y removes the value a of y from the support of a
+            table = [supported & ~(1 << a) for a, supported in enumerate(old)]
+        else:
+            # values of x past the end of either table have no support
+            table = [a & b for a, b in zip(old, table)]
+        self.constraints[x, y] = table
+
+    def add_different(self, x, y):
+        ''' Constrain `x` and `y` to take different values '''
+        self._add_arc(x, y, None)
+        self._add_arc(y, x, None)
+
+    def add_all_different(self, variables):
+        '''
+        Constrain `variables` to all take different values. As well as a
+        "different" constraint between every pair of them, this also finds
+        "hidden singles": if there are only as many values left between them
+        as there are variables, a value left in the domain of just one of
+        them must be that variable's value.
+        '''
+        variables = list(variables)
+        for i, x in enumerate(variables):
+            for y in variables[i+1:]:
+                self.add_different(x, y)
+        for x in variables:
+            self.variable_groups[x].append(len(self.groups))
+        self.groups.append(variables)
+
+    def add_constraint(self, x, y, allowed):
+        '''
+        Constrain `x` and `y` to values `a`, `b` for which `allowed(a, b)` is
+        True, in addition to any constraints already between them
+        '''
+        x_values = list(_values(self.domains[x]))
+        y_values = list(_values(self.domains[y]))
+        xy = [0] * (max(x_values) + 1 if x_values else 0)
+        yx = [0] * (max(y_values) + 1 if y_values else 0)
+        for a in x_values:
+            for b in y_values:
+                if allowed(a, b):
+                    xy[a] |= 1 << b
+                    yx[b] |= 1 << a
+        self._add_arc(x, y, xy)
+        self._add_arc(y, x, yx)
+
+    def _set_domain(self, x, domain):
+        self.trail.save(x, self.domains[x])
+        self.domains[x] = domain
+
+    def _revise(self, x, y):
+        '''
+        Remove the values of `x` without support in the domain of `y`, and
+        return whether anything was removed
+        '''
+        x_domain, y_domain = self.domains[x], self.domains[y]
+        table = self.constraints[x, y]
+        if table is None:
+            # a value of x only conflicts with y if it is y's only value
+            if y_domain & (y_domain - 1):
+                return False
+            removed = x_domain & y_domain if y_domain else x_domain
+        else:
+            removed = 0
+            for a in _values(x_domain):
+                if a >= len(table) or not table[a] & y_domain:
+                    removed |= 1 << a
+        if not removed:
+            return False
+        self._set_domain(x, x_domain & ~removed)
+        return True
+
+    def _revise_group(self, group):
+        '''
+        Narrow the domain of any variable of the all different `group` that is
+        the only one left with some value, when every value left has to be
+        used. Returns the variables changed, or None if there are not enough
+        values left for the variables.
+        '''
+        domains = self.domains
+        variables = self.groups[group]
+        # the values in at least one, and in at least two, of the domains
+        once = twice = 0
+        for x in variables:
+            twice |= once & domains[x]
+            once |= domains[x]
+        n_values = _domain_size(once)
+        if n_values < len(variables):
+            return None
+        unique = once & ~twice
+        if n_values > len(variables) or not unique:
+            return []
+        changed = []
+        for x in variables:
+            domain = domains[x] & unique
+            if domain & (domain - 1):
+                # x is the only variable left for two values
+                return None
+            if domain and domain != domains[x]:
+                self._set_domain(x, domain)
+                changed.append(x)
+        return changed
+
+    def AC3(self, changed=None):
+        '''
+        Make the unassigned variables arc consistent, returning False if a
+        domain is wiped out. If only the domains of the variables in
+        `changed` have changed since the last call, only the arcs pointing to
+        those need to be checked to begin with.
+
+        Once the arcs are consistent, the all different groups of every
+        variable changed are checked for hidden singles, and any variables
+        these narrow are made arc consistent in turn.
+        '''
+        assignment, neighbours = self.assignment, self.neighbours
+        if changed is None:
+            changed = range(len(self))
+        changed = set(changed)
+        arcs = deque((x, y) for y in changed for x in neighbours[y]
+                     if assignment[x] is None)
+        while True:
+            while arcs:
+                x, y = arcs.popleft()
+                if self._revise(x, y):
+                    if not self.domains[x]:
+                        return False
+                    changed.add(x)
+                    arcs.extend((z, x) for z in neighbours[x]
+                                if assignment[z] is None and z != y)
+            groups = set(group for x in changed
+                         for group in self.variable_groups[x])
+            changed = set()
+            for group in groups:
+                narrowed = self._revise_group(group)
+                if narrowed is None:
+                    return False
+                for x in narrowed:
+                    changed.add(x)
+                    arcs.extend((z, x) for z in neighbours[x]
+                                if assignment[z] is None)
+            if not arcs:
+                return True
+
+    def _backtrack(self, unassigned, select_variable, order_values):
+        '''
+        Assign a value to every variable in `unassigned`, returning whether
+        this was possible.
+
+        Rather than recursing once per variable, the search keeps an explicit
+        stack with a frame for each assigned variable: the variable, the
+        values of it left to try, and the mark on the trail from before it was
+        assigned, so undoing an assignment is a single `trail.undo`.
+        '''
+        assignment, trail = self.assignment, self.trail
+        stack = []
+        while True:
+            if not unassigned:
+                return True
+            x = select_variable(self, unassigned)
+            unassigned.remove(x)
+            stack.append((x, iter(order_values(self, x)), trail.mark()))
+            # find the next value to try for the deepest variable,
+            # backtracking out of variables with no values left
+            while stack:
+                x, values, mark = stack[-1]
+                if assignment[x] is not None:
+                    # undo everything since the last assignment of x
+                    assignment[x] = None
+                    trail.undo(self.domains, mark)
+                for value in values:
+                    assignment[x] = value
+                    self._set_domain(x, 1 << value)
+                    if self.AC3([x]):
+                        break
+                    assignment[x] = None
+                    trail.undo(self.domains, mark)
+                else:
+                    stack.pop()
+                    unassigned.add(x)
+                    continue
+                break
+            else:
+                return False
+
+    def solve(self, select_variable=most_constrained,
+              order_values=least_constraining_values):
+        '''
+        Return a value for every variable satisfying all of the constraints,
+        or None if there is none.
+
+        select_variable: heuristic choosing the next variable to assign to
+
+        order_values: heuristic ordering the values of that variable
+
+        '''
+        if not self.AC3():
+            return None
+        unassigned = set(x for x in range(len(self))
+                         if self.assignment[x] is None)
+        if not self._backtrack(unassigned, select_variable, order_values):
+            return None
+        return list(self.assignment)
+
+
+def main():
+    # 4 queens, with the variable of each column being the row of its queen
+    n = 4
+    queens = CSP([(1 << n) - 1] * n)
+    for c1 in range(n):
+        for c2 in range(c1 + 1, n):
+            queens.add_constraint(
+                c1, c2, lambda r1, r2, d=c2-c1: r1 != r2 and abs(r1-r2) != d)
+    print "4 queens: {}".format(queens.solve())
+    # map coloring of Australia with 3 colors
+    states = ["WA", "NT", "SA", "Q", "NSW", "V", "T"]
+    borders = [("WA", "NT"), ("WA", "SA"), ("NT", "SA"), ("NT", "Q"),
+               ("SA", "Q"), ("SA", "NSW"), ("SA", "V"), ("Q", "NSW"),
+               ("NSW", "V")]
+    australia = CSP([0b111] * len(states))
+    for s1, s2 in borders:
+        australia.add_different(states.index(s1), states.index(s2))
+    print "Coloring: {}".format(dict(zip(states, australia.solve())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+'''
+Exact cover with Knuth's Algorithm X, using "Dancing Links" (DLX).
+
+Given a set of columns (constraints) and a set of rows, each of which covers
+some of the columns, an exact cover is a selection of rows covering every
+column exactly once. Many puzzles are naturally exact cover problems: in
+sudoku, choosing a value for a square is a row, and the constraints "each
+square has a value" and "each row/column/subgrid has each value once" are the
+columns.
+
+Algorithm X repeatedly picks the column covered by the fewest remaining rows,
+tries each row that covers it, and removes every column that row covers along
+with every row that conflicts with it. With dancing links, the rows and
+columns are circular doubly linked lists of the 1's in the matrix, so removing
+an item and later putting it back are each O(1): when `x` is unlinked its own
+links still point at its old neighbours, which is all that is needed to
+relink it.
+
+Here the nodes of the linked lists live in flat integer arrays (one array per
+link direction) rather than being objects, which keeps large problems small in
+memory and cheap to traverse.
+
+"Secondary" columns may be covered at most once rather than exactly once (e.g.
+the diagonals in the N queens problem).
+
+'''
+from array import array
+
+
+class ExactCover:
+    '''
+    Args:
+        n_primary: number of columns that must be covered exactly once
+
+        n_secondary: number of columns that may be covered at most once. These
+                     are numbered after the primary columns
+
+    '''
+    def __init__(self, n_primary, n_secondary=0):
+        n_columns = n_primary + n_secondary
+        # node 0 is the root, and nodes 1, ..., n_columns are the column
+        # headers. Every other node is a 1 in the matrix
+        nodes = range(n_columns + 1)
+        self.left = array('l', nodes)
+        self.right = array('l', nodes)
+        self.up = array('l', nodes)
+        self.down = array('l', nodes)
+        # the column header of each node, and the row each node is in
+        self.column = array('l', nodes)
+        self.row = array('l', [-1]) * (n_columns + 1)
+        # the number of rows left in each column
+        self.size = array('l', [0]) * (n_columns + 1)
+        # link the primary column headers into a list with the root. The
+        # secondary headers link to themselves, so they are never chosen
+        for c in range(n_primary + 1):
+            self.left[c] = c - 1 if c > 0 else n_primary
+            self.right[c] = c + 1 if c < n_primary else 0
+        self.n_rows = 0
+
+    def add_row(self, columns):
+        '''
+        Add a row covering each of `columns` (numbered from 0), returning the
+        number of the row
+        '''
+        row = self.n_rows
+        self.n_rows += 1
+        first = None
+        for c in columns:
+            c += 1
+            node = len(self.column)
+            # insert the node at the bottom of column c ...
+            self.up.append(self.up[c])
+            self.down.append(c)
+            self.down[self.up[c]] = node
+            self.up[c] = node
+            self.column.append(c)
+            self.row.append(row)
+            self.size[c] += 1
+            # ... and at the end of this row
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+        return row
+
+    def _cover(self, c):
+        ''' Remove column `c` and every row covering it '''
+        left, right, up, down = self.left, self.right, self.up, self.down
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                self.size[self.column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c):
+        ''' Undo `_cover(c)`, relinking everything in reverse order '''
+        left, right, up, down = self.left, self.right, self.up, self.down
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                self.size[self.column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def _choose_column(self):
+        '''
+        The remaining primary column with the fewest rows, or None if every
+        primary column is covered
+        '''
+        right, size = self.right, self.size
+        best, c = None, right[0]
+        while c != 0:
+            if best is None or size[c] < size[best]:
+                best = c
+                if size[c] <= 1:
+                    break
+            c = right[c]
+        return best
+
+    def _cover_row(self, r):
+        ''' Cover the other columns of the row of node `r` '''
+        right, column = self.right, self.column
+        j = right[r]
+        while j != r:
+            self._cover(column[j])
+            j = right[j]
+
+    def _uncover_row(self, r):
+        ''' Undo `_cover_row(r)` '''
+        left, column = self.left, self.column
+        j = left[r]
+        while j != r:
+            self._uncover(column[j])
+            j = left[j]
+
+    def _search(self, chosen):
+        '''
+        Generate every exact cover, yielding each time `chosen` holds a node
+        of every row in one.
+
+        The search is iterative, with `chosen` as its stack: frame k is the
+        k'th column covered and the node of the row being tried in it (the
+        column header itself before any row has been tried), so there is no
+        limit on the depth. If the generator is closed early everything
+        still covered is uncovered, leaving the matrix as it was.
+        '''
+        down = self.down
+        columns = []
+        try:
+            c = self._choose_column()
+            while True:
+                if c is None:
+                    yield chosen
+                else:
+                    self._cover(c)
+                    columns.append(c)
+                    chosen.append(c)
+                # move on to the next row of the deepest column, backtracking
+                # out of columns whose rows have all been tried
+                while columns:
+                    c, r = columns[-1], chosen[-1]
+                    if r != c:
+                        self._uncover_row(r)
+                        chosen[-1] = c
+                    r = down[r]
+                    if r != c:
+                        self._cover_row(r)
+                        chosen[-1] = r
+                        break
+                    self._uncover(c)
+                    columns.pop()
+                    chosen.pop()
+                else:
+                    return
+                c = self._choose_column()
+        finally:
+            while columns:
+                c, r = columns.pop(), chosen.pop()
+                if r != c:
+                    self._uncover_row(r)
+                self._uncover(c)
+
+    def solutions(self):
+        '''
+        Generate every exact cover, as a list of row numbers. The matrix is
+        only restored once the generator is exhausted or closed
+        '''
+        row = self.row
+        search = self._search([])
+        try:
+            for chosen in search:
+                yield [row[r] for r in chosen]
+        finally:
+            search.close()
+
+    def solve(self):
+        ''' Return the first exact cover found, or None if there are none '''
+        search = self.solutions()
+        try:
+            return next(search, None)
+        finally:
+            search.close()
+
+    def count(self):
+        ''' Count the exact covers '''
+        total = 0
+        for _ in self._search([]):
+            total += 1
+        return total
+
+
+def sudoku_exact_cover(board):
+    '''
+    Build the exact cover problem for the n x n sudoku `board` (0 for an empty
+    square). Returns the problem, and the `(i, j, value)` choice represented by
+    each of its rows.
+    '''
+    n = len(board)
+    subgridsize = int(round(n ** 0.5))
+    # columns for: square (i, j) has a value; row i has value v; column j has
+    # value v; subgrid b has value v
+    problem = ExactCover(4 * n * n)
+    choices = []
+    for i in range(n):
+        for j in range(n):
+            b = (i // subgridsize) * subgridsize + j // subgridsize
+            values = [board[i][j]] if board[i][j] else range(1, n + 1)
+            for v in values:
+                problem.add_row([i * n + j,
+                                 n * n + i * n + v - 1,
+                                 2 * n * n + j * n + v - 1,
+                                 3 * n * n + b * n + v - 1])
+                choices.append((i, j, v))
+    return problem, choices
+
+
+def solve_sudoku(board):
+    '''
+    Same as `sudoku.solve_sudoku`, for boards with any subgrid size: fill in
+    `board` and return it, or return None if there is no solution
+    '''
+    problem, choices = sudoku_exact_cover(board)
+    solution = problem.solve()
+    if solution is None:
+        return None
+    for row in solution:
+        i, j, v = choices[row]
+        board[i][j] = v
+    return board
+
+
+def count_sudoku_solutions(board):
+    return sudoku_exact_cover(board)[0].count()
+
+
+def nqueens_exact_cover(n):
+    '''
+    Build the exact cover problem for placing `n` queens on an n x n board.
+    Every row and column must hold exactly one queen, and every diagonal at
+    most one. Returns the problem, and the `(row, col)` square represented by
+    each of its rows.
+    '''
+    # primary columns for the rows and columns of the board, and secondary
+    # columns for the 2n-1 diagonals in each direction
+    problem = ExactCover(2 * n, 2 * (2 * n - 1))
+    squares = []
+    for r in range(n):
+        for c in range(n):
+            problem.add_row([r, n + c,
+                             2 * n + r + c,
+                             2 * n + (2 * n - 1) + (r - c + n - 1)])
+            squares.append((r, c))
+    return problem, squares
+
+
+def nqueens(n):
+    '''
+    Return the squares of `n` non-attacking queens on an n x n board, or None
+    if there is no solution
+    '''
+    problem, squares = nqueens_exact_cover(n)
+    solution = problem.solve()
+    if solution is None:
+        return None
+    return sorted(squares[row] for row in solution)
+
+
+def count_nqueens(n):
+    return nqueens_exact_cover(n)[0].count()
+
+
+def benchmark():
+    ''' Compare against the backtracking sudoku and N queens solvers '''
+    import copy
+    import os
+    import sys
+    import time
+    import sudoku
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 os.pardir))
+    from backtracking.nqueens import Board
+
+    board = [[1, 0, 0, 0, 0, 7, 0, 9, 0],
+             [0, 3, 0, 0, 2, 0, 0, 0, 8],
+             [0, 0, 9, 6, 0, 0, 5, 0, 0],
+             [0, 0, 5, 3, 0, 0, 9, 0, 0],
+             [0, 1, 0, 0, 8, 0, 0, 0, 2],
+             [6, 0, 0, 0, 0, 4, 0, 0, 0],
+             [3, 0, 0, 0, 0, 0, 0, 1, 0],
+             [0, 4, 0, 0, 0, 0, 0, 0, 7],
+             [0, 0, 7, 0, 0, 0, 3, 0, 0]]
+    for name, solve in (("backtracking", sudoku.solve_sudoku),
+                        ("dancing links", solve_sudoku)):
+        t = time.time()
+        solve(copy.deepcopy(board))
+        print "sudoku, {}: {:.3f}s".format(name, time.time() - t)
+    n = 12
+    t = time.time()
+    Board(n)._solve_from_col(0)
+    print "{} queens, backtracking: {:.3f}s".format(n, time.time() - t)
+    t = time.time()
+    nqueens(n)
+    print "{} queens, dancing links: {:.3f}s".format(n, time.time() - t)
+
+
+def main():
+    board = [[0, 6, 0, 8, 0, 0, 0, 1, 0],
+             [2, 0, 0, 0, 1, 0, 0, 0, 4],
+             [0, 0, 0, 9, 0, 0, 0, 0, 0],
+             [0, 0, 0, 0, 5, 0, 6, 0, 8],
+             [0, 1, 0, 0, 0, 0, 0, 2, 0],
+             [9, 0, 5, 0, 4, 0, 0, 0, 0],
+             [0, 0, 0, 0, 0, 1, 0, 0, 0],
+             [5, 0, 0, 0, 3, 0, 0, 0, 2],
+             [0, 8, 0, 0, 0, 6, 0, 7, 0]]
+    print "Solutions: {}".format(count_sudoku_solutions(board))
+    print "\n".join(" ".join(map(str, row)) for row in solve_sudoku(board))
+    print "8 queens: {}".format(nqueens(8))
+    print "Number of 8 queens solutions: {}".format(count_nqueens(8))
+    # stopping a search partway through leaves the matrix as it was
+    problem = nqueens_exact_cover(6)[0]
+    problem.solve()
+    after_solve = problem.count()
+    next(problem.solutions())
+    print "6 queens solutions, after solve: {}, after a first solution: " \
+        "{}".format(after_solve, problem.count())
+    # the search is iterative, so it is not limited by the recursion depth
+    print "Empty 36 x 36 sudoku solved: {}".format(
+        solve_sudoku([[0] * 36 for _ in range(36)]) is not None)
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
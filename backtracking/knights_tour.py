@@ -18,6 +18,66 @@ A: Can use backtracking. The below implementation does not make any further
       61 50 53 40 59 38 55 42
 
 '''
+import multiprocessing
+from array import array
+
+
+# define moves a knight can make
+_MOVES = [(-2, -1), (-2, 1), (-1, 2), (-1, -2),
+          (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def _find_tour(m, n):
+    '''
+    Find a knight's tour of an m x n board starting from the upper left
+    square, returned as an array of the squares of the tour in order, where
+    square `(r, c)` is `r*n + c`, or None if there is no tour.
+
+    The board is a flat bytearray of visited squares, and the tour an array
+    of integers, so the search holds no Python objects per square.
+    '''
+    visited = bytearray(m * n)
+    tour = array('i')
+
+    # Unlike the n queens problem where we could place one queen per column in
+    # order to reduce the size of our backtracking problem, we cannot make any
+    # (simple) simplifications here. As such we simply iterate through all
+    # possile valid moves and backtrack on the invalid ones
+
+    def _find_solution(last_m, last_n):
+        '''
+        Find out if there is a way for the knight to make a tour from the
+        current state of `visited` and `tour`, with `(last_m, last_n)` being
+        the most recent placement of the knight.
+
+        Returns True if a tour was found, and False otherwise.
+
+        '''
+        if len(tour) == m*n:
+            # We found a tour
+            return True
+        # try and make a move
+        for move_m, move_n in _MOVES:
+            next_m, next_n = last_m + move_m, last_n + move_n
+            if ((0 <= next_m < m) and
+               (0 <= next_n < n) and
+               not visited[next_m*n + next_n]):
+                # We can make a valid move
+                visited[next_m*n + next_n] = 1
+                tour.append(next_m*n + next_n)
+                if _find_solution(next_m, next_n):
+                    return True
+                # Backtrack
+                visited[next_m*n + next_n] = 0
+                tour.pop()
+        # If we get to this point, we cannot find a solution from the current
+        # state of the board
+        return False
+
+    # Place the knight on the upper left square, and solve from there
+    visited[0] = 1
+    tour.append(0)
+    return tour if _find_solution(0, 0) else None
 
 
 def knights_tour(board):
@@ -42,59 +102,288 @@ def knights_tour(board):
         for n_ in xrange(n):
             board[m_][n_] = None
 
-    # define moves a knight can make
-    moves = [(-2, -1), (-2, 1), (-1, 2), (-1, -2),
-             (1, -2), (1, 2), (2, -1), (2, 1)]
+    compact = knights_tour_array(m, n)
+    if compact is None:
+        return None
+    for m_ in xrange(m):
+        board[m_][:] = compact[m_*n:(m_+1)*n]
+    return board
 
-    # Unlike the n queens problem where we could place one queen per column in
-    # order to reduce the size of our backtracking problem, we cannot make any
-    # (simple) simplifications here. As such we simply iterate through all
-    # possile valid moves and backtrack on the invalid ones
 
-    def _find_solution(board, last_move, last_move_idx):
-        '''
-        Find out if there is a way for the knight to make a tour from the
-        current state of the board `board` with `last_move` being the
-        coordinates of the most recent placement of a knight on move number
-        `last_move_idx`.
+def knights_tour_array(m, n):
+    '''
+    Same as `knights_tour`, but for a compact m x n board: return an array of
+    m*n integers where `board[r*n + c]` is the move on which the knight visits
+    square `(r, c)`, or None if no tour is possible. This takes 4 bytes per
+    square, rather than a list of Python ints for every row.
+    '''
+    tour = _find_tour(m, n)
+    if tour is None:
+        return None
+    board = array('i', [0]) * (m * n)
+    for i, square in enumerate(tour):
+        board[square] = i
+    return board
 
-        If a solution exists, return the board with the tour. If not, return
-        `None`
 
-        '''
-        if last_move_idx == m*n - 1:
-            # We found a tour
-            return board
-        # try and make a move
-        for move_m, move_n in moves:
-            next_move = last_move[0] + move_m, last_move[1] + move_n
-            next_move_m, next_move_n = next_move
-            if ((0 <= next_move_m < m) and
-               (0 <= next_move_n < n) and
-               board[next_move_m][next_move_n] is None):
-                # We can make a valid move
-                board[next_move_m][next_move_n] = last_move_idx + 1
-                solved_board = _find_solution(board,
-                                              next_move,
-                                              last_move_idx+1)
-                if solved_board is not None:
-                    return solved_board
-                else:
-                    # Backtrack
-                    board[next_move_m][next_move_n] = None
-        # If we get to this point, we cannot find a solution from the current
-        # state of `board`
-        return None
+def knights_tour_moves(m, n):
+    '''
+    Generate the `(row, col)` of each square of a knight's tour of an m x n
+    board in order, so that a tour can be written out (e.g. to a file) a move
+    at a time. Nothing is generated if no tour is possible.
+
+    Only the output is streamed: without any heuristics the search may undo
+    any of its moves until it has found the whole tour, so the tour is found
+    before its first move is generated.
+    `knights_tour_warnsdorf.knights_tour_moves` generates moves as the search
+    makes them.
+    '''
+    tour = _find_tour(m, n)
+    for square in tour or ():
+        yield divmod(square, n)
+
+
+# Counting and enumerating every tour
+#
+# To find every tour, rather than just one, the visited squares are kept as
+# the bits of an integer, so that `(square, visited)` identifies the state of
+# the search. Whenever no tour can be completed from a state, it is recorded
+# as a dead end, so that the search never explores it again however the knight
+# gets there.
+#
+# Open tours are counted as sequences of moves (so every tour is counted once
+# in each direction), and closed tours as cycles (so each is counted once,
+# whatever square or direction it is started from).
+
+def _neighbours(m, n):
+    ''' The squares `r*n + c` a knight can move to from each square '''
+    return [[r2*n + c2 for r2, c2 in ((r + dm, c + dn) for dm, dn in _MOVES)
+             if 0 <= r2 < m and 0 <= c2 < n]
+            for r in xrange(m) for c in xrange(n)]
+
+
+def _masks(neighbours):
+    ''' The neighbours of each square as a bitmask '''
+    return [sum(1 << j for j in squares) for squares in neighbours]
+
+
+def _moves(neighbours, masks, square, unvisited):
+    '''
+    The unvisited squares worth moving to from `square`, given the bitmask of
+    `unvisited` squares.
+
+    Forward checking: an unvisited neighbour of `square` with no unvisited
+    neighbours of its own can never be reached once we move anywhere else, so
+    it has to be the next (and last) move, and if there are two of them we
+    are at a dead end.
+    '''
+    moves = [j for j in neighbours[square] if unvisited >> j & 1]
+    stranded = [j for j in moves if not masks[j] & unvisited]
+    if len(stranded) > 1:
+        return []
+    return stranded or moves
+
+
+def _symmetries(m, n):
+    '''
+    The symmetries of an m x n board, as lists mapping each square to its
+    image: rotations by 180 degrees and reflections, and for square boards
+    also rotations by 90 degrees and reflections in the diagonals
+    '''
+    maps = [lambda r, c: (r, c), lambda r, c: (m-1-r, n-1-c),
+            lambda r, c: (m-1-r, c), lambda r, c: (r, n-1-c)]
+    if m == n:
+        maps += [lambda r, c: (c, r), lambda r, c: (n-1-c, m-1-r),
+                 lambda r, c: (c, m-1-r), lambda r, c: (n-1-c, r)]
+    return [[g(r, c)[0]*n + g(r, c)[1] for r in xrange(m) for c in xrange(n)]
+            for g in maps]
+
+
+def _extend(neighbours, masks, full, tour, visited, end_mask, dead):
+    '''
+    Generate every tour (i.e. the list `tour` each time it covers the board)
+    extending `tour`, where `visited` is the bitmask of the squares in `tour`.
+    If `end_mask` is not None, the tour must end on one of the squares in
+    it. States found to be dead ends are added to `dead`.
+    '''
+    square = tour[-1]
+    if visited == full:
+        if end_mask is None or end_mask >> square & 1:
+            yield tour
+        return
+    if (square, visited) in dead:
+        return
+    unvisited = full & ~visited
+    if end_mask is not None and not end_mask & unvisited:
+        # there is no square left to return to the start from
+        dead.add((square, visited))
+        return
+    found = False
+    for j in _moves(neighbours, masks, square, unvisited):
+        tour.append(j)
+        for complete in _extend(neighbours, masks, full, tour,
+                                visited | 1 << j, end_mask, dead):
+            found = True
+            yield complete
+        tour.pop()
+    if not found:
+        dead.add((square, visited))
+
+
+def _count_extensions(neighbours, masks, full, square, visited, end_mask,
+                      dead, counts):
+    '''
+    Count the tours extending a tour that ends at `square` and visits the
+    squares in `visited`, as for `_extend`. Counts of states that are reached
+    more than once are remembered in `counts`.
+    '''
+    if visited == full:
+        return 1 if end_mask is None or end_mask >> square & 1 else 0
+    key = (square, visited)
+    if key in dead:
+        return 0
+    if key in counts:
+        return counts[key]
+    unvisited = full & ~visited
+    total = 0
+    if end_mask is None or end_mask & unvisited:
+        for j in _moves(neighbours, masks, square, unvisited):
+            total += _count_extensions(neighbours, masks, full, j,
+                                       visited | 1 << j, end_mask, dead,
+                                       counts)
+    if total == 0:
+        dead.add(key)
+    else:
+        counts[key] = total
+    return total
+
+
+def _prefixes(m, n, closed, k):
+    '''
+    The starting moves the search for every tour is split up by: the tours
+    of up to `k` squares that every tour begins with, along with the number
+    of tours each of them stands for.
+
+    By symmetry, open tours from squares that are images of each other under
+    a symmetry of the board are counted the same, so only those from the
+    first square of each set of images are searched. Closed tours are all
+    started from the corner, leaving it towards (1, 2).
+    '''
+    neighbours = _neighbours(m, n)
+    if closed:
+        if n + 2 not in neighbours[0] or 2*n + 1 not in neighbours[0]:
+            # the corner does not have the two moves a closed tour needs
+            return []
+        starts = [([0, n + 2], 1)]
+    else:
+        images = zip(*_symmetries(m, n))
+        starts = [([s], len(set(images[s]))) for s in xrange(m * n)
+                  if s == min(images[s])]
+    prefixes = []
+    for tour, weight in starts:
+        stack = [tour]
+        while stack:
+            tour = stack.pop()
+            if len(tour) >= k or len(tour) == m * n:
+                prefixes.append((tour, weight))
+                continue
+            stack.extend(tour + [j] for j in neighbours[tour[-1]]
+                         if j not in tour)
+    return prefixes
+
+
+def _count_prefix(task):
+    '''
+    Count the tours of an m x n board starting with `prefix`, multiplied by
+    `weight`, where `task` is `(m, n, closed, prefix, weight)`
+    '''
+    m, n, closed, prefix, weight = task
+    neighbours = _neighbours(m, n)
+    visited = sum(1 << s for s in prefix)
+    end_mask = sum(1 << s for s in neighbours[0]) if closed else None
+    return weight * _count_extensions(neighbours, _masks(neighbours),
+                                      (1 << (m*n)) - 1, prefix[-1], visited,
+                                      end_mask, set(), {})
+
+
+def count_tours(m, n, closed=False, processes=1, prefix_length=4):
+    '''
+    Count the open (or, if `closed`, closed) knight's tours of an m x n
+    board.
+
+    The search is split up by the first `prefix_length` squares of each tour,
+    which are counted by `processes` worker processes.
+    '''
+    if m * n == 0 or (closed and m * n == 1):
+        return 0
+    tasks = [(m, n, closed, prefix, weight)
+             for prefix, weight in _prefixes(m, n, closed, prefix_length)]
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            return sum(pool.map(_count_prefix, tasks, chunksize=1))
+        finally:
+            pool.close()
+            pool.join()
+    return sum(map(_count_prefix, tasks))
+
+
+def all_tours(m, n, closed=False, unique=False):
+    '''
+    Generate every open (or, if `closed`, closed) knight's tour of an m x n
+    board, each as a list of squares numbered `r*n + c`. Closed tours start
+    from the corner, leaving it towards (1, 2), so each is generated once.
+
+    If `unique`, only one tour of each set of tours that are images of each
+    other under a symmetry of the board is generated.
+    '''
+    if m * n == 0 or (closed and m * n == 1):
+        return
+    neighbours = _neighbours(m, n)
+    masks = _masks(neighbours)
+    symmetries = _symmetries(m, n)
+    full = (1 << (m*n)) - 1
+    end_mask = sum(1 << s for s in neighbours[0]) if closed else None
+    if unique or closed:
+        starts = [prefix for prefix, _ in _prefixes(m, n, closed, 1)]
+    else:
+        starts = [[s] for s in xrange(m * n)]
+
+    def _canonical(tour):
+        ''' The tour as closed tours are generated, i.e. from the corner '''
+        i = tour.index(0)
+        tour = tour[i:] + tour[:i]
+        return tour if tour[1] == n + 2 else tour[:1] + tour[:0:-1]
 
-    # Place the knight on the upper left square
-    board[0][0] = 0
-    # Solve from this position
-    solved_board = _find_solution(board, (0, 0), 0)
-    # Return the solution (potentially None)
-    return solved_board
+    dead = set()
+    for start in starts:
+        for tour in _extend(neighbours, masks, full, list(start),
+                            sum(1 << s for s in start), end_mask, dead):
+            if unique:
+                images = [[g[s] for s in tour] for g in symmetries[1:]]
+                if closed:
+                    images = map(_canonical, images)
+                if any(image < tour for image in images):
+                    continue
+            yield list(tour)
 
 
 def main():
+    # the tour can be generated a move at a time
+    m, n = 5, 5
+    print "Tour of a {}x{} board: {}".format(
+        m, n, " ".join("{},{}".format(*move)
+                       for move in knights_tour_moves(m, n)))
+    # every tour of small boards can be counted or generated
+    print "Open tours of a {}x{} board: {}".format(m, n, count_tours(m, n))
+    print "Open tours of a {}x{} board up to symmetry: {}".format(
+        m, n, sum(1 for _ in all_tours(m, n, unique=True)))
+    m, n = 3, 10
+    print "Closed tours of a {}x{} board: {}".format(
+        m, n, count_tours(m, n, closed=True,
+                          processes=multiprocessing.cpu_count()))
+    # without any heuristics, searching for a tour of a larger board takes a
+    # very long time
     m, n = 12, 12
     board = [[None for _ in range(n)] for _ in range(m)]
     solved_board = knights_tour(board)
@@ -25,9 +25,16 @@ A: Can use backtracking, with a common simplification to improve efficiency.
    900 in squares is likely to result in stack overflow (this algorithm
    is recursive, and python's default max recursion depth is 1000, so a
    recursive call stack greater than this length will throw a RuntimeError.
+   `warnsdorff_tour` below has no such limit.
+
+   For even larger boards, `closed_tour` below splits the board into small
+   tiles whose tours are joined together, and does not search at all.
 
 '''
 import heapq
+import random
+import tempfile
+from array import array
 
 
 def knights_tour(board):
@@ -138,6 +145,421 @@ def knights_tour(board):
     return solved_board
 
 
+# The moves a knight can make, as (rows, columns)
+_MOVES = [(-2, -1), (-2, 1), (-1, 2), (-1, -2),
+          (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def _move_tables(m, n):
+    '''
+    Precompute the moves of a knight on an m x n board, where square `(r, c)`
+    is numbered `r*n + c`.
+
+    Returns `(valid, table)`, where bit `i` of `valid[k]` is set if move `i`
+    stays on the board from square `k`, and `table[valid[k]]` is the tuple of
+    amounts to add to `k` to make each of those moves. This takes a single
+    byte per square, rather than a list of neighbours for every square.
+    '''
+    def _mask(size, index, coordinate):
+        return sum(1 << i for i, move in enumerate(_MOVES)
+                   if 0 <= coordinate + move[index] < size)
+    row_masks = [_mask(m, 0, r) for r in xrange(m)]
+    col_masks = [_mask(n, 1, c) for c in xrange(n)]
+    valid = bytearray(m * n)
+    for r in xrange(m):
+        row_mask = row_masks[r]
+        valid[r*n:(r+1)*n] = bytearray(row_mask & col_mask
+                                       for col_mask in col_masks)
+    offsets = [dr*n + dc for dr, dc in _MOVES]
+    table = [tuple(offsets[i] for i in xrange(8) if mask >> i & 1)
+             for mask in xrange(256)]
+    return valid, table
+
+
+def warnsdorff_moves(m, n, start=(0, 0), lookahead=4096):
+    '''
+    Generate the squares of a knight's tour of an m x n board starting from
+    square `start` in order, as the search chooses them, using Warnsdorff's
+    rule: always move to the unvisited square with the fewest onward moves.
+    Ties are broken first by Roth's rule (the square furthest from the centre
+    of the board) and then by Pohl's rule (the square whose unvisited
+    neighbours have the fewest onward moves between them). With these the
+    search almost never needs to backtrack, so tours of even 1000 x 1000
+    boards take time linear in the size of the board.
+
+    Rather than recursing, the tour is kept on an explicit stack, along with
+    the number of candidate moves tried from each square of it. Since
+    backtracking restores the board exactly, the candidates from a square are
+    always ordered the same way, so they do not need to be stored.
+
+    Each square is generated as soon as the search has moved `lookahead` (at
+    least 1) squares past it, and is then dropped from the stack, so the
+    search can still backtrack over the last `lookahead` squares (it rarely
+    goes back more than a few dozen). If it ever has to go back further than
+    that, RuntimeError is raised, since those squares have already been
+    generated. With `lookahead` None nothing is generated until the whole tour
+    has been found, and nothing at all if there is no tour.
+
+    Squares are numbered so that square `(r, c)` is `r*n + c`.
+
+    '''
+    size = m * n
+    valid, table = _move_tables(m, n)
+    visited = bytearray(size)
+    # the number of unvisited squares a knight can move to from each square
+    degree = bytearray(bin(mask).count('1') for mask in xrange(256))
+    degree = bytearray(degree[mask] for mask in valid)
+    # twice the squared distance from the centre of the board of each row
+    # and column, for breaking ties
+    row_dist = [(2*r - m + 1) ** 2 for r in xrange(m)]
+    col_dist = [(2*c - n + 1) ** 2 for c in xrange(n)]
+
+    def _visit(k):
+        visited[k] = 1
+        for offset in table[valid[k]]:
+            degree[k + offset] -= 1
+
+    def _unvisit(k):
+        visited[k] = 0
+        for offset in table[valid[k]]:
+            degree[k + offset] += 1
+
+    def _candidates(k, last):
+        '''
+        The unvisited squares reachable from `k` in the order to try them.
+        '''
+        candidates = [k + offset for offset in table[valid[k]]
+                      if not visited[k + offset]]
+        if not last and not all(degree[j] for j in candidates):
+            # Forward checking: a square with no onward moves could only be
+            # the end of the tour, but there are more moves to make after it,
+            # and once we move elsewhere it can never be reached again
+            return []
+        if len(candidates) <= 1:
+            return candidates
+        # only compute the tie breaking keys when there is a tie
+        min_degree = min(degree[j] for j in candidates)
+        if sum(1 for j in candidates if degree[j] == min_degree) == 1:
+            return sorted(candidates, key=degree.__getitem__)
+
+        def _key(j):
+            pohl = sum(degree[j + offset] for offset in table[valid[j]]
+                       if not visited[j + offset])
+            r, c = divmod(j, n)
+            return degree[j], -(row_dist[r] + col_dist[c]), pohl
+        return sorted(candidates, key=_key)
+
+    if size == 0:
+        return
+    if lookahead is None:
+        lookahead = size
+    first = start[0]*n + start[1]
+    _visit(first)
+    tour = array('i', [first])
+    # the number of candidates tried from each square of the tour
+    tried = array('i', [0])
+    # the number of squares generated from the start of the stack, and the
+    # number dropped from it before that
+    generated = dropped = 0
+    while dropped + len(tour) < size:
+        candidates = _candidates(tour[-1], dropped + len(tour) == size - 1)
+        if tried[-1] < len(candidates):
+            k = candidates[tried[-1]]
+            tried[-1] += 1
+            _visit(k)
+            tour.append(k)
+            tried.append(0)
+            if len(tour) - generated > lookahead:
+                yield tour[generated]
+                generated += 1
+                if generated == lookahead:
+                    del tour[:generated]
+                    del tried[:generated]
+                    dropped += generated
+                    generated = 0
+        elif len(tour) > max(generated, 1):
+            # backtrack
+            _unvisit(tour.pop())
+            tried.pop()
+        elif dropped or generated:
+            raise RuntimeError(
+                "Backtracked past the squares already generated")
+        else:
+            # every move from the starting square has been tried
+            return
+    for k in tour[generated:]:
+        yield k
+
+
+def warnsdorff_tour(m, n, start=(0, 0)):
+    '''
+    Find a knight's tour of an m x n board starting from square `start`, as
+    generated by `warnsdorff_moves`.
+
+    Returns: an array of the squares of the tour in order, where square
+             `(r, c)` is `r*n + c`, or None if there is no tour
+
+    '''
+    tour = array('i', warnsdorff_moves(m, n, start, lookahead=None))
+    if m * n and not tour:
+        return None
+    return tour
+
+
+# Divide and conquer closed tours
+#
+# Following Parberry ("An efficient algorithm for the Knight's tour problem",
+# 1997), a closed tour of a large board is built by splitting the board into
+# quadrants, finding a closed tour of each, and joining them into one at the
+# centre of the board. Every closed tour contains both moves out of each
+# corner square, and the tours of the small boards at the bottom of the
+# recursion are also chosen to be "structured": at each corner (in rows and
+# columns counted inwards from the corner) they contain the move between
+# squares (0, 1) and (2, 0). To join the quadrants, one of these corner moves
+# is removed from the corner of each quadrant at the centre of the board,
+# leaving four paths, and their ends are connected by four new moves across
+# the quadrants. Quadrants of a quadrant are joined at their own centre, away
+# from its corners, so the joined tours are structured as well.
+#
+# Nothing is searched for besides the tours of the small boards, which take a
+# fraction of a second to find the first time they are needed, and the tour is
+# generated a tile at a time, so only the tiles on the current path of the
+# recursion are held in memory.
+
+# the sizes of the small boards, which are never split any further
+_TILE_SIZES = [(6, 6), (6, 8), (8, 6), (8, 8), (8, 10), (10, 8), (10, 10),
+               (10, 12), (12, 10)]
+
+_tiles = None
+
+
+def _structured_tour(m, n, max_nodes=10000):
+    '''
+    Search for a structured closed tour of an m x n board, returned as a list
+    of squares (numbered `r*n + c`) starting from the corner square 0.
+
+    This is a depth first search ordered by Warnsdorff's rule. If it has not
+    succeeded after `max_nodes` moves, it starts again with ties broken at
+    random instead, as a bad choice early on can take a very long time to
+    undo.
+    '''
+    size = m * n
+    valid, table = _move_tables(m, n)
+    degrees = bytearray(bin(mask).count('1') for mask in xrange(256))
+    # the required corner moves, between (0, 1) and (2, 0) from each corner
+    partner = {}
+    for r, c, dr, dc in [(0, 0, 1, 1), (0, n-1, 1, -1),
+                         (m-1, 0, -1, 1), (m-1, n-1, -1, -1)]:
+        a, b = r*n + c + dc, (r + 2*dr)*n + c
+        partner[a], partner[b] = b, a
+    # the tour leaves the corner for (1, 2), and returns to it from (2, 1)
+    first, last = n + 2, 2*n + 1
+    rng = random.Random(0)
+    tie_break = [0] * size
+
+    def _search(tour, visited, degree, nodes):
+        if len(tour) == size:
+            return True
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            return False
+        k = tour[-1]
+        if k in partner and partner[k] != tour[-2]:
+            # we did not arrive by the required move, so leave by it
+            candidates = [partner[k]]
+        else:
+            candidates = [k + offset for offset in table[valid[k]]]
+        candidates = [
+            j for j in candidates
+            if not visited[j] and (j != last or len(tour) == size - 1) and
+            not (j in partner and partner[j] != k and visited[partner[j]])]
+        candidates.sort(key=lambda j: (degree[j], tie_break[j]))
+        for j in candidates:
+            tour.append(j)
+            visited[j] = 1
+            for offset in table[valid[j]]:
+                degree[j + offset] -= 1
+            # there must be a way out of every unvisited square
+            if len(tour) == size - 1 or \
+               all(degree[j + offset] or visited[j + offset]
+                   for offset in table[valid[j]]):
+                if _search(tour, visited, degree, nodes):
+                    return True
+            tour.pop()
+            visited[j] = 0
+            for offset in table[valid[j]]:
+                degree[j + offset] += 1
+        return False
+
+    while True:
+        tour = [0, first]
+        visited = bytearray(size)
+        degree = bytearray(degrees[mask] for mask in valid)
+        for k in tour:
+            visited[k] = 1
+            for offset in table[valid[k]]:
+                degree[k + offset] -= 1
+        if _search(tour, visited, degree, [0]):
+            return tour
+        tie_break = [rng.random() for _ in xrange(size)]
+
+
+def _load_tiles():
+    '''
+    The structured tours of each of the `_TILE_SIZES`, searched for the first
+    time they are needed
+    '''
+    global _tiles
+    if _tiles is None:
+        _tiles = {(m, n): _structured_tour(m, n) for m, n in _TILE_SIZES}
+    return _tiles
+
+
+def _halves(size):
+    ''' Split an even `size` into two even sizes, as evenly as possible '''
+    half = size // 2
+    return (half, half) if half % 2 == 0 else (half - 1, half + 1)
+
+
+def closed_tour(m, n):
+    '''
+    Generate a closed knight's tour of an m x n board, as the `(row, col)` of
+    each square in the order they are visited, starting from `(0, 0)`. The
+    last square is a knight's move from `(0, 0)`.
+
+    `m` and `n` must be even, at least 6, and differ by at most 2. Even boards
+    of 10^8 squares take time linear in their size, and very little memory.
+    '''
+    if m % 2 or n % 2 or min(m, n) < 6 or abs(m - n) > 2:
+        raise ValueError("Closed tours are only built for even m, n >= 6 "
+                         "differing by at most 2")
+    tiles = _load_tiles()
+
+    def _walk(top, left, h, w, s, t):
+        '''
+        Generate the squares of the tour of the h x w board with top left
+        square `(top, left)` (squares are numbered `row*n + col`) in lists,
+        starting from square `s` and ending at its neighbour `t` on the tour.
+        The move from `s` to `t` must not be one that is removed to join
+        quadrants together.
+        '''
+        if min(h, w) < 12:
+            cycle = [(top + k // w) * n + left + k % w for k in tiles[h, w]]
+            i = cycle.index(s)
+            if cycle[i - 1] == t:
+                yield cycle[i:] + cycle[:i]
+            else:
+                yield cycle[i::-1] + cycle[:i:-1]
+            return
+        h1, h2 = _halves(h)
+        w1, w2 = _halves(w)
+        r, c = top + h1, left + w1
+        # the quadrants in the order the joined tour visits them, and the
+        # squares the tour enters and leaves each one by
+        quadrants = [(top, left, h1, w1), (top, c, h1, w2),
+                     (r, c, h2, w2), (r, left, h2, w1)]
+        ends = [((r-2)*n + c-3, (r-1)*n + c-1),
+                ((r-3)*n + c, (r-1)*n + c+1),
+                ((r+1)*n + c+2, r*n + c),
+                ((r+2)*n + c-1, r*n + c-2)]
+        row, col = divmod(s, n)
+        i = [[0, 1], [3, 2]][row >= r][col >= c]
+        enter, leave = ends[i]
+        previous = None
+        joined = False
+        for squares in _walk(*(quadrants[i] + (s, t))):
+            if not joined:
+                # look for the removed move, between `enter` and `leave`
+                for a, b in ((leave, enter), (enter, leave)):
+                    if b in squares:
+                        p = squares.index(b)
+                        if (squares[p-1] if p else previous) == a:
+                            break
+                else:
+                    previous = squares[-1]
+                    yield squares
+                    continue
+                joined = True
+                if p:
+                    yield squares[:p]
+                # go around the other quadrants instead, in the order the
+                # joined tour visits them if we are leaving this one
+                for j in range(1, 4):
+                    if a == leave:
+                        q = (i + j) % 4
+                        walk = _walk(*(quadrants[q] + ends[q]))
+                    else:
+                        q = (i - j) % 4
+                        walk = _walk(*(quadrants[q] + ends[q][::-1]))
+                    for other in walk:
+                        yield other
+                squares = squares[p:]
+            yield squares
+
+    # start at the corner, going away from the square (1, 2)
+    for squares in _walk(0, 0, m, n, 0, n + 2):
+        for k in squares:
+            yield divmod(k, n)
+
+
+def knights_tour_moves(m, n):
+    '''
+    Generate the `(row, col)` of each square of a knight's tour of an m x n
+    board, starting from `(0, 0)`. Nothing is generated if there is no tour.
+
+    Where possible this is the closed tour from `closed_tour`, which is
+    generated as it goes, so even the largest boards can be written out a
+    move at a time. Otherwise the tour is generated by `warnsdorff_moves` as
+    it is found, so RuntimeError may be raised partway through if the search
+    has to backtrack past moves it has already generated. On a board with no
+    tour (e.g. 2 x 10000) this can happen instead of generating nothing.
+    '''
+    if m % 2 == 0 and n % 2 == 0 and min(m, n) >= 6 and abs(m - n) <= 2:
+        for square in closed_tour(m, n):
+            yield square
+        return
+    for square in warnsdorff_moves(m, n):
+        yield divmod(square, n)
+
+
+def knights_tour_array(m, n):
+    '''
+    Same as `knights_tour`, but for a compact m x n board: return an array of
+    m*n integers where `board[r*n + c]` is the move on which the knight visits
+    square `(r, c)`, or None if no tour is possible. This takes 4 bytes per
+    square, rather than a list of Python ints for every row.
+    '''
+    board = array('i', [-1]) * (m * n)
+    try:
+        for i, (r, c) in enumerate(knights_tour_moves(m, n)):
+            board[r*n + c] = i
+    except RuntimeError:
+        # the streamed search backtracked past what it had generated, so find
+        # the whole tour before filling in the board
+        tour = warnsdorff_tour(m, n)
+        if tour is None:
+            return None
+        for i, k in enumerate(tour):
+            board[k] = i
+    if m * n and board[0] == -1:
+        return None
+    return board
+
+
+def write_moves(moves, f):
+    '''
+    Write the `(row, col)` moves of a tour to the file `f`, one "row col" per
+    line, without holding more than a few thousand of them in memory
+    '''
+    lines = []
+    for r, c in moves:
+        lines.append("{} {}\n".format(r, c))
+        if len(lines) == 4096:
+            f.writelines(lines)
+            lines = []
+    f.writelines(lines)
+
+
 def main():
     m, n = 8, 8
     board = [[None for _ in range(n)] for _ in range(m)]
@@ -151,6 +573,31 @@ def main():
                    r[1:],
                    format_str.format(r[0]))
             for r in solved_board)
+    # the iterative version handles much larger boards
+    m = n = 500
+    tour = warnsdorff_tour(m, n)
+    if tour is not None:
+        print "Found a tour of a {}x{} board ending at {}".format(
+            m, n, divmod(tour[-1], n))
+    # and closed tours can be generated for larger boards still
+    m = n = 2000
+    for move, square in enumerate(closed_tour(m, n)):
+        pass
+    print "Closed tour of a {}x{} board: {} moves, ending at {}".format(
+        m, n, move + 1, square)
+    # tours can be streamed straight to a file, or kept as a compact array
+    with tempfile.TemporaryFile() as f:
+        write_moves(knights_tour_moves(m, n), f)
+        print "Wrote the tour to a file of {} bytes".format(f.tell())
+    m, n = 7, 9
+    board = knights_tour_array(m, n)
+    print "Square (6, 8) of a {}x{} board is visited on move {}".format(
+        m, n, board[6*n + 8])
+    # boards without a closed tour are streamed as the search goes as well
+    m, n = 999, 1000
+    moves = knights_tour_moves(m, n)
+    print "First moves of a {}x{} board: {}".format(
+        m, n, [next(moves) for _ in range(4)])
 
 
 if __name__ == '__main__':
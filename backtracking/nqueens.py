@@ -5,6 +5,7 @@ Problem: Place N queens on an N x N chess board such that no two queens are
 attacking each other.
 
 '''
+import multiprocessing
 
 
 class Board():
@@ -95,10 +96,132 @@ class Board():
         return board_str
 
 
+# Bitboard solver
+#
+# Queens are placed one row at a time, and the columns and diagonals that are
+# already attacked are each tracked as the bits of an integer, where bit `c`
+# is column `c` of the current row. Moving down a row, the attacked "/"
+# diagonals shift one column to the left and the "\" diagonals one to the
+# right, so the free squares of a row are found with a couple of bitwise
+# operations rather than by scanning the board.
+
+def _count_from(full, cols, left, right):
+    '''
+    Count the ways of completing a board where `cols`, `left` and `right` are
+    the columns and diagonals attacked in the current row, and `full` has a
+    bit set for every column
+    '''
+    if cols == full:
+        return 1
+    total = 0
+    free = full & ~(cols | left | right)
+    while free:
+        # the lowest free column
+        bit = free & -free
+        free ^= bit
+        total += _count_from(full, cols | bit, ((left | bit) << 1) & full,
+                             (right | bit) >> 1)
+    return total
+
+
+def queens(n):
+    '''
+    Generate every solution for `n` queens, as a list of the column of the
+    queen in each row. The search keeps its own stack, so the free squares of
+    each row are all that is stored between solutions.
+    '''
+    full = (1 << n) - 1
+    if n == 0:
+        yield []
+        return
+    positions = []
+    # the attacked columns and diagonals, and the squares left to try, of
+    # each row placed so far
+    stack = [(0, 0, 0, full)]
+    while stack:
+        cols, left, right, free = stack[-1]
+        if not free:
+            # every square in this row has been tried, so backtrack
+            stack.pop()
+            if positions:
+                positions.pop()
+            continue
+        bit = free & -free
+        stack[-1] = (cols, left, right, free ^ bit)
+        if len(positions) == len(stack):
+            positions[-1] = bit.bit_length() - 1
+        else:
+            positions.append(bit.bit_length() - 1)
+        cols, left, right = (cols | bit, ((left | bit) << 1) & full,
+                             (right | bit) >> 1)
+        if cols == full:
+            yield list(positions)
+            continue
+        stack.append((cols, left, right, full & ~(cols | left | right)))
+
+
+def find_queens(n):
+    '''
+    Return a solution for `n` queens (as for `queens`), or None if there is
+    no solution
+    '''
+    for positions in queens(n):
+        return positions
+    return None
+
+
+def _count_first_row(task):
+    '''
+    Count the solutions for `n` queens with the queen of the first row in
+    column `col`, where `task` is `(n, col)`
+    '''
+    n, col = task
+    full = (1 << n) - 1
+    bit = 1 << col
+    return _count_from(full, bit, (bit << 1) & full, bit >> 1)
+
+
+def count_queens(n, processes=1):
+    '''
+    Count the solutions for `n` queens.
+
+    The count is split up by the column of the queen in the first row, and
+    these can be counted by separate worker processes. By symmetry, a queen in
+    column `c` of the first row has as many solutions as one in column
+    `n-1-c`, so only the first half of the columns are counted.
+    '''
+    if n == 0:
+        return 1
+    tasks = [(n, col) for col in range((n + 1) // 2)]
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            counts = pool.map(_count_first_row, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        counts = map(_count_first_row, tasks)
+    total = 2 * sum(counts)
+    if n % 2:
+        # the middle column is its own mirror image
+        total -= counts[-1]
+    return total
+
+
 def main():
     n = 16
     board = Board(n)
     board.solve()
+    # the bitboard solver is fast enough for much larger boards
+    n = 24
+    board = Board(n)
+    for row, col in enumerate(find_queens(n)):
+        board.place(row, col)
+    print "\n{} queens:\n{}".format(n, board)
+    n = 12
+    print "\nSolutions for {} queens: {}".format(
+        n, count_queens(n, processes=multiprocessing.cpu_count()))
 
 
 if __name__ == '__main__':
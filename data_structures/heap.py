@@ -34,9 +34,10 @@ class Heap:
         ''' utility method to swap 2 values in the heap '''
         self.heap[idx1], self.heap[idx2] = self.heap[idx2], self.heap[idx1]
 
-    def _percolate_up(self):
-        # we want to percolate up the last value in the heap
-        current_idx = len(self.heap)-1
+    def _percolate_up(self, current_idx=None):
+        # by default we want to percolate up the last value in the heap
+        if current_idx is None:
+            current_idx = len(self.heap)-1
         while current_idx != 1:
             parent_idx = current_idx / 2
             if self.heap[parent_idx] > self.heap[current_idx]:
@@ -52,8 +53,7 @@ class Heap:
                 return ridx
         return lidx
 
-    def _percolate_down(self):
-        current_idx = 1
+    def _percolate_down(self, current_idx=1):
         lchild_idx, rchild_idx = 2*current_idx, 2*current_idx+1
         while lchild_idx < len(self.heap):
             # we know the current node at least has a left child
@@ -71,19 +71,87 @@ class Heap:
     def __len__(self):
         return len(self.heap)-1
 
+    def peek(self):
+        ''' Return the top of the heap without removing it '''
+        return self.heap[1]
+
     def push(self, val):
         self.heap.append(val)
         self._percolate_up()
 
     def pop(self):
         ret = self.heap[1]
-        # replace first element with the last
-        self.heap[1] = self.heap.pop()
-        self._percolate_down()
+        last = self.heap.pop()
+        if len(self.heap) > 1:
+            # replace first element with the last
+            self.heap[1] = last
+            self._percolate_down()
         # return the original top value
         return ret
 
 
+class IndexedHeap(Heap):
+    '''
+    A binary minimum heap of `(key, item)` pairs that also keeps track of the
+    position of every item in the heap. Knowing where an item lives lets us
+    lower its key and restore the heap property by percolating it up, which
+    is O(log(n)) rather than the O(n) needed to re-heapify the entire heap.
+
+    This "decrease key" operation is exactly what Dijkstra's, A* and Prim's
+    algorithms need when relaxing an edge.
+
+    Items must be hashable, and an item may only be in the heap once.
+
+    '''
+    def __init__(self):
+        Heap.__init__(self)
+        # map each item to its index in self.heap
+        self.position = {}
+
+    def _heap_swap(self, idx1, idx2):
+        ''' swap 2 values in the heap and update their positions '''
+        Heap._heap_swap(self, idx1, idx2)
+        self.position[self.heap[idx1][1]] = idx1
+        self.position[self.heap[idx2][1]] = idx2
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def key(self, item):
+        ''' Return the current key of `item` '''
+        return self.heap[self.position[item]][0]
+
+    def push(self, item, key):
+        if item in self.position:
+            raise ValueError("{} is already in the heap".format(item))
+        self.position[item] = len(self.heap)
+        self.heap.append((key, item))
+        self._percolate_up()
+
+    def pop(self):
+        ''' Remove and return the `(key, item)` pair with the smallest key '''
+        ret = self.heap[1]
+        del self.position[ret[1]]
+        last = self.heap.pop()
+        if len(self.heap) > 1:
+            # replace first element with the last
+            self.heap[1] = last
+            self.position[last[1]] = 1
+            self._percolate_down()
+        return ret
+
+    def decrease_key(self, item, key):
+        '''
+        Lower the key of `item` (already in the heap) to `key`, and move it up
+        the heap to maintain the heap property
+        '''
+        idx = self.position[item]
+        if key > self.heap[idx][0]:
+            raise ValueError("New key is larger than the current key")
+        self.heap[idx] = (key, item)
+        self._percolate_up(idx)
+
+
 def main():
     heap = Heap()
     values = [6, 2, 4, 5, 9, 3, 10, 7]
@@ -92,6 +160,14 @@ def main():
     print heap
     print "Popping {}".format(heap.pop())
     print heap
+    # an indexed heap allows us to update keys in place
+    iheap = IndexedHeap()
+    for item, key in zip("abcdefgh", values):
+        iheap.push(item, key)
+    print iheap
+    iheap.decrease_key('h', 1)
+    print "Popping {}".format(iheap.pop())
+    print iheap
 
 
 if __name__ == '__main__':
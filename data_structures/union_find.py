@@ -0,0 +1,102 @@
+'''
+Union Find / Disjoint Set data structure.
+
+Keeps track of a partition of the elements 0, 1, ..., n-1 into disjoint sets,
+supporting finding which set an element belongs to, and merging two sets,
+both in essentially O(1) amortized time.
+
+Each set is represented as a tree whose root is the "representative" of the
+set. The trees are stored in flat arrays of integers rather than as objects,
+so even very large partitions take little memory.
+
+'''
+from array import array
+
+
+class UnionFind:
+    '''
+    Args:
+        n: the number of elements, each of which starts in its own set
+
+    '''
+    def __init__(self, n):
+        # the parent of each element in its tree (roots are their own parent)
+        self.parent = array('l', xrange(n))
+        # the number of elements in the tree rooted at each element
+        self.size = array('l', [1]) * n
+        # the number of disjoint sets
+        self.n_components = n
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, v):
+        '''
+        Return the "representative/root" element of the set that `v` belongs
+        to.
+
+        Simultaneously applies path halving, pointing every other element on
+        the path to the root at its grandparent, so that later finds are
+        faster. This is done iteratively, so even long chains cannot exceed
+        the recursion limit.
+        '''
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def union(self, v1, v2):
+        '''
+        Merge the sets containing `v1` and `v2`, returning False if they were
+        already in the same set and True otherwise
+        '''
+        v1root, v2root = self.find(v1), self.find(v2)
+        if v1root == v2root:
+            return False
+        # attach the smaller tree to the larger to keep the trees shallow
+        if self.size[v1root] < self.size[v2root]:
+            v1root, v2root = v2root, v1root
+        self.parent[v2root] = v1root
+        self.size[v1root] += self.size[v2root]
+        self.n_components -= 1
+        return True
+
+    def connected(self, v1, v2):
+        ''' Check if `v1` and `v2` are in the same set '''
+        return self.find(v1) == self.find(v2)
+
+    def find_many(self, vs):
+        ''' Return the representatives of each element of `vs`, in order '''
+        find = self.find
+        return [find(v) for v in vs]
+
+    def union_many(self, pairs):
+        '''
+        Merge the sets of every `(v1, v2)` pair in `pairs`, returning the
+        number of merges that took place
+        '''
+        union = self.union
+        return sum(1 for v1, v2 in pairs if union(v1, v2))
+
+    def set_size(self, v):
+        ''' The number of elements in the set containing `v` '''
+        return self.size[self.find(v)]
+
+
+def main():
+    uf = UnionFind(10)
+    uf.union_many([(0, 1), (2, 3), (1, 3), (5, 6), (7, 8), (8, 9)])
+    print "Components: {}".format(uf.n_components)
+    print "Representatives: {}".format(uf.find_many(range(10)))
+    print "0 and 2 connected: {}".format(uf.connected(0, 2))
+    print "0 and 4 connected: {}".format(uf.connected(0, 4))
+    # a long chain is no problem for the iterative find
+    chain = UnionFind(10**5)
+    for i in xrange(1, len(chain)):
+        chain.parent[i] = i - 1
+    print "Root of chain: {}".format(chain.find(len(chain) - 1))
+
+
+if __name__ == '__main__':
+    main()
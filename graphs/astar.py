@@ -1,5 +1,12 @@
+import os
 import sys
-import heapq
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.heap import IndexedHeap
+from csr import neighbours, reverse
+from dijkstra import _bidirectional_search, shortest_path_tree
 
 
 def astar(D, H, start, end):
@@ -10,57 +17,57 @@ def astar(D, H, start, end):
     graph is disconnected)
 
     D: weighted adjacency matrix representation of the graph, where `D[i][j]`
-       is the cost to travel from node `i` to node `j`
+       is the cost to travel from node `i` to node `j`, or the same graph as a
+       `CSRGraph`
 
     H: heuristic (e.g. "estimated") distances from each node in the graph to
-       the target node `end`
+       the target node `end`, e.g. euclidean distances, or
+       `Landmarks.heuristic(end)` for graphs without coordinates
 
     start: index of the source node
 
     end: index of the target node
 
     '''
+    # keep track of where we've come from
+    previous = [None for _ in xrange(len(D))]
+    # actual cost of the best known path to each node
+    costs = [sys.maxint for _ in xrange(len(D))]
+    costs[start] = 0
+    # nodes whose shortest path is known
+    settled = [False for _ in xrange(len(D))]
     # priority queue prioritizing vertices with the lowest costs
     # prioritizing is done using a combination of the heuristic distance and
     # the actual distance
-    pq = []
-    # keep track of where we've come from
-    previous = [None for _ in D]
-    # create a list of heuristic-cost, actual cost, index triples to serve as
-    # pointers to items in the priority queue, so that we can modify items in
-    # the pq in place
-    costs = [[sys.maxint, sys.maxint, i] for i in xrange(len(D))]
-    # combined actual-heuristic cost for start node
-    costs[start][0] = H[start]
-    # actual distance from start node is 0
-    costs[start][1] = 0
-    # initialize the priority queue
-    for i in xrange(len(D)):
-        heapq.heappush(pq, costs[i])
+    pq = IndexedHeap()
+    pq.push(start, H[start])
     while pq:
         # get the next lowest cost node from the priority queue
-        h_cost, cost_to_i, i = heapq.heappop(pq)
+        _, i = pq.pop()
+        settled[i] = True
         if i == end:
             # we arrived at the optimal solution
             break
-        if cost_to_i == sys.maxint:
-            # `end` is not reachable from `start`
-            raise RuntimeError("No path from {} to {} found".format(start, end))
+        cost_to_i = costs[i]
         # explore the neighbors of this node
-        for j in xrange(len(D)):
-            if D[i][j] != 0:
+        for j, weight in neighbours(D, i):
+            if not settled[j]:
                 # i and j are adjacent
                 # compare the actual total cost so far with the actual total
                 # cost using i (not the heuristic cost)
-                cost_with_i = cost_to_i + D[i][j]
-                if cost_with_i < costs[j][1]:
+                cost_with_i = cost_to_i + weight
+                if cost_with_i < costs[j]:
                     # update with the new cost
-                    costs[j][1] = cost_with_i
-                    # update the new cost with heuristic
-                    costs[j][0] = costs[j][1] + H[j]
+                    costs[j] = cost_with_i
                     previous[j] = i
-                    # maintain heap structure
-                    heapq.heapify(pq)
+                    # prioritize using the new cost with heuristic
+                    if j in pq:
+                        pq.decrease_key(j, cost_with_i + H[j])
+                    else:
+                        pq.push(j, cost_with_i + H[j])
+    if not settled[end]:
+        # `end` is not reachable from `start`
+        raise RuntimeError("No path from {} to {} found".format(start, end))
     # reconstruct the path in reversed order
     path = []
     prev = end
@@ -71,6 +78,133 @@ def astar(D, H, start, end):
     return path
 
 
+def bidirectional_astar(D, H, H_start, start, end, R=None):
+    '''
+    Same as `astar(D, H, start, end)`, but searching from both `start` and
+    `end` at once.
+
+    H_start: heuristic distances from each node in the graph to the source
+             node `start` (used to guide the backwards search)
+
+    R: the graph `D` with its edges reversed. If not given it will be computed,
+       so pass `D` itself for undirected graphs
+
+    Both `H` and `H_start` must be consistent (e.g. euclidean distances). The
+    two searches then use the average potential (H[i] - H_start[i]) / 2 and
+    its negative, which are consistent in both directions so that the simple
+    bidirectional Dijkstra stopping criterion remains correct.
+
+    '''
+    if R is None:
+        R = reverse(D)
+    potential = [(H[i] - H_start[i]) / 2.0 for i in xrange(len(D))]
+    _, path = _bidirectional_search(D, R, start, end, potential)
+    return path
+
+
+_INF = float('inf')
+
+
+class _LandmarkHeuristic:
+    '''
+    Lower bounds on the distances from every node to a fixed node `target` of
+    the graph, computed on demand from the distances to and from a set of
+    landmarks using the triangle inequality. Indexable like the heuristic list
+    `H` passed to `astar`.
+
+    If `to_target` is False, the bounds are instead on the distances from
+    `target` to every node (as needed for the `H_start` of
+    `bidirectional_astar`).
+    '''
+    def __init__(self, landmarks, target, to_target=True):
+        # for the target t, a landmark L and a node v:
+        #     d(v, t) >= d(L, t) - d(L, v)
+        #     d(v, t) >= d(v, L) - d(t, L)
+        # and swapping the roles of v and t gives bounds on d(t, v)
+        if to_target:
+            self.first, self.second = landmarks.dist_from, landmarks.dist_to
+        else:
+            self.first, self.second = landmarks.dist_to, landmarks.dist_from
+        self.target_dists = [(l, self.first[l][target], self.second[l][target])
+                             for l in xrange(len(landmarks.nodes))]
+
+    def __getitem__(self, v):
+        bound = 0
+        for l, first_target, second_target in self.target_dists:
+            # infinite distances give no information
+            first_v, second_v = self.first[l][v], self.second[l][v]
+            if first_target != _INF and first_v != _INF:
+                bound = max(bound, first_target - first_v)
+            if second_target != _INF and second_v != _INF:
+                bound = max(bound, second_v - second_target)
+        return bound
+
+
+class Landmarks:
+    '''
+    Precomputed shortest path distances between a few "landmark" nodes and
+    every other node of a graph, which give A* a heuristic for any graph via
+    the triangle inequality, without needing coordinates (the ALT algorithm:
+    A*, Landmarks and Triangle inequality).
+
+    Landmarks are chosen greedily to be as far as possible from those chosen
+    so far, as landmarks "behind" the target give the tightest bounds.
+
+    Args:
+        D: the graph, as for `astar`
+
+        k: the number of landmarks
+
+        R: the graph `D` with its edges reversed. If not given it will be
+           computed, so pass `D` itself for undirected graphs
+
+    '''
+    def __init__(self, D, k, R=None):
+        if R is None:
+            R = reverse(D)
+        n = len(D)
+        k = min(k, n)
+        self.nodes = []
+        # `dist_from[l][v]` is the distance from landmark `l` to `v` and
+        # `dist_to[l][v]` the distance from `v` to landmark `l`, both
+        # infinite if there is no path
+        self.dist_from = []
+        self.dist_to = []
+        # distance from each node to its closest landmark so far
+        closest = array('d', [_INF]) * n
+        # start the selection from whichever node is furthest from node 0
+        candidate = 0
+        if n:
+            candidate = max(xrange(n), key=self._distances(D, 0).__getitem__)
+        for _ in xrange(k):
+            self.nodes.append(candidate)
+            self.dist_from.append(self._distances(D, candidate))
+            self.dist_to.append(self._distances(R, candidate))
+            for v in xrange(n):
+                closest[v] = min(closest[v], self.dist_from[-1][v])
+            candidate = max(xrange(n), key=closest.__getitem__)
+
+    @staticmethod
+    def _distances(D, source):
+        ''' Shortest path distances from `source` as an array of doubles '''
+        costs, _ = shortest_path_tree(D, source)
+        return array('d', (_INF if c == sys.maxint else c for c in costs))
+
+    def heuristic(self, end):
+        '''
+        Return lower bounds on the distance from every node to `end`, to be
+        used as `H` in `astar(D, H, start, end)`
+        '''
+        return _LandmarkHeuristic(self, end)
+
+    def heuristic_from(self, start):
+        '''
+        Return lower bounds on the distance from `start` to every node, to be
+        used as `H_start` in `bidirectional_astar`
+        '''
+        return _LandmarkHeuristic(self, start, to_target=False)
+
+
 def main():
     from sample_graphs import g3_data
     g3, labels, coords = g3_data
@@ -83,6 +217,17 @@ def main():
     path = astar(g3, H, startidx, endidx)
     labeled_path = [labels[i] for i in path]
     print " -> ".join(labeled_path)
+    # the heuristic from the start node guides the backwards search
+    startx, starty = coords[startidx]
+    H_start = [((coord[0]-startx)**2 + (coord[1]-starty)**2)**0.5
+               for coord in coords]
+    path = bidirectional_astar(g3, H, H_start, startidx, endidx, R=g3)
+    print "bidirectional: " + " -> ".join(labels[i] for i in path)
+    # landmarks give a heuristic without using the coordinates
+    landmarks = Landmarks(g3, 3, R=g3)
+    print "landmarks: " + " ".join(labels[i] for i in landmarks.nodes)
+    path = astar(g3, landmarks.heuristic(endidx), startidx, endidx)
+    print "ALT: " + " -> ".join(labels[i] for i in path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,135 @@
+'''
+Boruvka's algorithm to find the Minimum Spanning Tree (MST) of a graph.
+
+Start with every vertex as its own component. In each round, find the
+cheapest edge leaving every component and add all of them to the MST at once,
+merging the components they join. Every round at least halves the number of
+components, so there are at most log(V) rounds, each a single pass over the
+edges.
+
+Unlike Prim's and Kruskal's algorithms, the work in a round does not depend on
+the order in which edges are looked at, so the pass over the edges can be
+split into chunks handled by separate worker processes, whose cheapest edges
+are then combined.
+
+Ties between edges of equal weight are broken by their position in the edge
+list, so that the cheapest edges of a round can never form a cycle.
+
+'''
+import multiprocessing
+import os
+import sys
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.union_find import UnionFind
+from csr import EdgeList
+
+
+# the graph of the current worker process
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _cheapest_edges(task, graph=None):
+    '''
+    `task` is a `(start, stop, component)` triple, where `component[v]` is
+    the component of vertex `v`. Return a dict mapping each component to the
+    index of the cheapest edge amongst edges `start` to `stop - 1` of `graph`
+    (by default the graph the worker was initialized with) that leaves it.
+    '''
+    if graph is None:
+        graph = _worker_graph
+    start, stop, component = task
+    sources, targets, weights = graph.sources, graph.targets, graph.weights
+    cheapest = {}
+    for k in xrange(start, stop):
+        c1, c2 = component[sources[k]], component[targets[k]]
+        if c1 == c2:
+            # the edge is inside a component
+            continue
+        for c in (c1, c2):
+            best = cheapest.get(c)
+            if best is None or (weights[k], k) < (weights[best], best):
+                cheapest[c] = k
+    return cheapest
+
+
+def boruvka(graph, processes=1, min_edges=10**5):
+    '''
+    Boruvka's algorithm to return the MST of `graph` (or a minimum spanning
+    forest if `graph` is disconnected), of the same weight as that returned by
+    `kruskal(graph)`
+
+    graph: adjacency matrix, `CSRGraph` or `EdgeList`
+
+    processes: number of worker processes to split each round between
+
+    min_edges: graphs with fewer edges than this are always handled in the
+               calling process, as it would not be worth using the workers
+
+    Returns: a list of edges in the graph, where an edge is a 3 element
+             tuple (weight, vertex1, vertex2)
+
+    '''
+    if not isinstance(graph, EdgeList):
+        graph = EdgeList.from_graph(graph)
+    n_vertices, n_edges = len(graph), graph.n_edges()
+    sources, targets, weights = graph.sources, graph.targets, graph.weights
+    components = UnionFind(n_vertices)
+    mst = []
+    pool = None
+    if processes > 1 and n_edges >= max(min_edges, 1):
+        pool = multiprocessing.Pool(processes, _init_worker, (graph,))
+        chunk = -(-n_edges // processes)
+    try:
+        while True:
+            component = array('l', components.find_many(xrange(n_vertices)))
+            if pool is None:
+                cheapest = _cheapest_edges((0, n_edges, component), graph)
+            else:
+                # combine the cheapest edges found by each worker
+                cheapest = {}
+                tasks = [(start, min(start + chunk, n_edges), component)
+                         for start in xrange(0, n_edges, chunk)]
+                for partial in pool.map(_cheapest_edges, tasks):
+                    for c, k in partial.iteritems():
+                        best = cheapest.get(c)
+                        if best is None or \
+                           (weights[k], k) < (weights[best], best):
+                            cheapest[c] = k
+            if not cheapest:
+                # no edges leave any component, so we are done
+                break
+            # two components may have chosen the same edge, so only add the
+            # edges that still join different components
+            for k in sorted(set(cheapest.itervalues())):
+                if components.union(sources[k], targets[k]):
+                    mst.append((weights[k], sources[k], targets[k]))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return mst
+
+
+def main():
+    from sample_graphs import g2_data
+    adj_matrix, labels = g2_data
+    mst = boruvka(adj_matrix)
+    weight = sum(map(lambda x: x[0], mst))
+    print "Edges in MST:"
+    for edge in mst:
+        print labels[edge[1]] + "->" + labels[edge[2]]
+    print "MST Weight: {}".format(weight)
+    mst = boruvka(adj_matrix, processes=2, min_edges=0)
+    print "MST Weight (2 processes): {}".format(sum(e[0] for e in mst))
+
+
+if __name__ == '__main__':
+    main()
@@ -21,44 +21,13 @@ Q: Given a grid which has a color in each square, return the total number of
               1 cluster of (Y)ellow
 
 '''
+import os
+import sys
 from collections import defaultdict
 
-
-def _get_nbrs((row, col), grid, color):
-    ''' Find cells adjacent to `(row, col)` of the same color '''
-    nbrs = set()
-    for (i, j) in ((1, 0), (0, 1), (-1, 0), (0, -1)):
-        nbr_i, nbr_j = row + i, col + j
-        if any((nbr_i < 0,
-                nbr_j < 0,
-                nbr_i == len(grid),
-                nbr_j == len(grid[0]))):
-            # out of bounds square
-            continue
-        if grid[nbr_i][nbr_j] == color:
-            # an adjacent cell of the same color
-            nbrs.add((nbr_i, nbr_j))
-    return nbrs
-
-
-def _mark_connected_seen((row, col), color, seen, grid):
-    '''
-    Mark all cells belonging to same color cluster as the cell at
-    `(row, col)` as seen
-    '''
-    to_visit = [(row, col)]
-    # visit in DFS manner
-    while to_visit:
-        (cell_row, cell_col) = to_visit.pop()
-        if seen[cell_row][cell_col]:
-            # we've been here
-            continue
-        # we haven't been here
-        seen[cell_row][cell_col] = True
-        # add all adjacent squares of same color to to_visit
-        nbrs = _get_nbrs((cell_row, cell_col), grid, color)
-        to_visit.extend(nbrs)
-    return seen
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.union_find import UnionFind
 
 
 def count_connected_colors(grid):
@@ -68,19 +37,24 @@ def count_connected_colors(grid):
     '''
     n_rows = len(grid)
     n_cols = len(grid[0])
-    seen = [[False for _ in range(n_cols)]
-            for _ in range(n_rows)]
+    # number the cells row by row, and put each in its own cluster
+    clusters = UnionFind(n_rows * n_cols)
+    # merge the clusters of adjacent cells of the same color, looking down
+    # and to the right of each cell
+    for row in range(n_rows):
+        for col in range(n_cols):
+            cell = row * n_cols + col
+            if row + 1 < n_rows and grid[row+1][col] == grid[row][col]:
+                clusters.union(cell, cell + n_cols)
+            if col + 1 < n_cols and grid[row][col+1] == grid[row][col]:
+                clusters.union(cell, cell + 1)
     color_count = defaultdict(lambda: 0)
-    # iterate over entire grid
+    # count each cluster once, by its representative cell
     for row in range(n_rows):
         for col in range(n_cols):
-            if seen[row][col]:
-                continue
-            else:
-                color = grid[row][col]
-                color_count[color] += 1
-                # mark all squares adjacent to this one seen
-                seen = _mark_connected_seen((row, col), color, seen, grid)
+            cell = row * n_cols + col
+            if clusters.find(cell) == cell:
+                color_count[grid[row][col]] += 1
     # return mapping, cast from defaultdict to dict
     return dict(color_count)
 
@@ -0,0 +1,342 @@
+'''
+Contraction Hierarchies: preprocess a static weighted graph once so that
+shortest path queries on it are answered much faster than by running
+Dijkstra's algorithm from scratch every time.
+
+Preprocessing "contracts" the nodes of the graph one at a time, from least to
+most important. Contracting node `v` removes it from the graph, and whenever
+the only shortest path between two of its remaining neighbours `u` and `x`
+went through `v`, a "shortcut" edge u->x of weight w(u, v) + w(v, x) is added
+to preserve the shortest path costs. Each node's rank is the order in which it
+was contracted.
+
+Every shortest path in the original graph then has a counterpart in the graph
+with shortcuts that first only goes up in rank and then only goes down in
+rank. So a query only needs a forwards Dijkstra search from the source using
+edges that go up in rank, and a backwards search from the target using edges
+that come down in rank, both of which explore a tiny part of the graph.
+Shortcuts remember the node they bypass, so paths can be unpacked back into
+edges of the original graph.
+
+'''
+import cPickle as pickle
+import heapq
+import os
+import sys
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.heap import IndexedHeap
+from csr import CSRGraph, neighbours
+
+
+def _witness_cost(out_edges, source, target, skip, max_cost, max_settled):
+    '''
+    Cost of the shortest path from `source` to `target` in the (partially
+    contracted) graph `out_edges` that avoids the node `skip`, giving up once
+    paths cost more than `max_cost` or `max_settled` nodes have been settled.
+    Returns sys.maxint if no such path was found.
+    '''
+    costs = {source: 0}
+    pq = [(0, source)]
+    n_settled = 0
+    while pq and n_settled < max_settled:
+        cost, node = heapq.heappop(pq)
+        if cost > costs[node]:
+            # stale queue entry
+            continue
+        if node == target:
+            return cost
+        if cost > max_cost:
+            break
+        n_settled += 1
+        for neighbour, (weight, _) in out_edges[node].iteritems():
+            if neighbour == skip:
+                continue
+            cost_with_node = cost + weight
+            if cost_with_node < costs.get(neighbour, sys.maxint):
+                costs[neighbour] = cost_with_node
+                heapq.heappush(pq, (cost_with_node, neighbour))
+    return sys.maxint
+
+
+def _shortcuts(v, out_edges, in_edges, max_settled):
+    '''
+    Find the shortcuts needed if `v` were contracted now, as a list of
+    `(u, x, weight)` triples for shortcuts u->x
+    '''
+    shortcuts = []
+    if not out_edges[v]:
+        return shortcuts
+    max_out = max(w for w, _ in out_edges[v].itervalues())
+    for u, (w_uv, _) in in_edges[v].iteritems():
+        for x, (w_vx, _) in out_edges[v].iteritems():
+            if x == u:
+                continue
+            cost = w_uv + w_vx
+            # only add the shortcut if there is no other path ("witness")
+            # from u to x which is at least as cheap
+            if _witness_cost(out_edges, u, x, v,
+                             w_uv + max_out, max_settled) > cost:
+                shortcuts.append((u, x, cost))
+    return shortcuts
+
+
+def _add_edge(out_edges, in_edges, u, x, weight, middle):
+    ''' Add the edge u->x unless there already is a cheaper one '''
+    if weight < out_edges[u].get(x, (sys.maxint, None))[0]:
+        out_edges[u][x] = (weight, middle)
+        in_edges[x][u] = (weight, middle)
+
+
+def _to_csr(n, edges):
+    '''
+    Build a `CSRGraph` from `edges`, a list of `(i, j, weight, middle)`
+    tuples, and a parallel array of the middle node of each edge (-1 for
+    edges of the original graph)
+    '''
+    edges.sort(key=lambda e: e[0])
+    graph = CSRGraph.from_edges(n, [e[:3] for e in edges])
+    # `from_edges` keeps edges in order, so the middles line up
+    middles = array('l', (-1 if e[3] is None else e[3] for e in edges))
+    return graph, middles
+
+
+class ContractionHierarchy:
+    '''
+    A contraction hierarchy of a weighted graph.
+
+    Args:
+        rank: array where `rank[i]` is the order in which node `i` was
+              contracted
+
+        up: `CSRGraph` of the edges i->j with rank[i] < rank[j]
+
+        up_middles: array of the node bypassed by each edge of `up` (-1 if
+                    the edge is in the original graph)
+
+        down: `CSRGraph` of the edges j->i with rank[j] > rank[i], stored
+              reversed, i.e. as i->j
+
+        down_middles: array of the node bypassed by each edge of `down`
+
+    '''
+    def __init__(self, rank, up, up_middles, down, down_middles):
+        self.rank = rank
+        self.up = up
+        self.up_middles = up_middles
+        self.down = down
+        self.down_middles = down_middles
+
+    def __len__(self):
+        return len(self.rank)
+
+    @classmethod
+    def build(cls, D, max_settled=50):
+        '''
+        Build the contraction hierarchy of the graph `D`, which may be an
+        adjacency matrix or a `CSRGraph`.
+
+        max_settled: how many nodes each witness search may settle before
+                     giving up and adding the shortcut anyway. Larger values
+                     give fewer shortcuts but slower preprocessing
+
+        '''
+        n = len(D)
+        # the remaining graph, as maps from each neighbour to the
+        # `(weight, middle)` of the edge to (or from) it
+        out_edges = [{} for _ in xrange(n)]
+        in_edges = [{} for _ in xrange(n)]
+        for i in xrange(n):
+            for j, weight in neighbours(D, i):
+                if i != j:
+                    _add_edge(out_edges, in_edges, i, j, weight, None)
+        rank = array('l', [0]) * n
+        # how many neighbours of each node have been contracted, which helps
+        # to spread contractions uniformly over the graph
+        n_contracted = [0 for _ in xrange(n)]
+        # the final edges of the hierarchy
+        up_edges, down_edges = [], []
+
+        def _priority(v, shortcuts):
+            # the "edge difference": how many edges contracting `v` would add
+            # to the graph
+            return (len(shortcuts) - len(out_edges[v]) - len(in_edges[v]) +
+                    n_contracted[v])
+
+        pq = [(_priority(v, _shortcuts(v, out_edges, in_edges, max_settled)),
+               v) for v in xrange(n)]
+        heapq.heapify(pq)
+        next_rank = 0
+        while pq:
+            _, v = heapq.heappop(pq)
+            # contracting other nodes may have changed the priority of `v`,
+            # so lazily update it and try again if it is no longer the lowest
+            shortcuts = _shortcuts(v, out_edges, in_edges, max_settled)
+            priority = _priority(v, shortcuts)
+            if pq and priority > pq[0][0]:
+                heapq.heappush(pq, (priority, v))
+                continue
+            rank[v] = next_rank
+            next_rank += 1
+            # all remaining neighbours of `v` will be contracted after it, so
+            # its edges are now final
+            for x, (weight, middle) in out_edges[v].iteritems():
+                up_edges.append((v, x, weight, middle))
+                del in_edges[x][v]
+                n_contracted[x] += 1
+            for u, (weight, middle) in in_edges[v].iteritems():
+                down_edges.append((v, u, weight, middle))
+                del out_edges[u][v]
+                n_contracted[u] += 1
+            out_edges[v], in_edges[v] = {}, {}
+            for u, x, weight in shortcuts:
+                _add_edge(out_edges, in_edges, u, x, weight, v)
+        up, up_middles = _to_csr(n, up_edges)
+        down, down_middles = _to_csr(n, down_edges)
+        return cls(rank, up, up_middles, down, down_middles)
+
+    def save(self, filepath):
+        '''
+        Write the hierarchy to `filepath`, as a small header followed by the
+        raw contents of each array
+        '''
+        arrays = [self.rank,
+                  self.up.offsets, self.up.targets, self.up.weights,
+                  self.up_middles,
+                  self.down.offsets, self.down.targets, self.down.weights,
+                  self.down_middles]
+        with open(filepath, 'wb') as f:
+            pickle.dump([(a.typecode, len(a)) for a in arrays], f,
+                        pickle.HIGHEST_PROTOCOL)
+            for a in arrays:
+                a.tofile(f)
+
+    @classmethod
+    def load(cls, filepath):
+        ''' Read a hierarchy written by `save` '''
+        arrays = []
+        with open(filepath, 'rb') as f:
+            for typecode, length in pickle.load(f):
+                a = array(typecode)
+                a.fromfile(f, length)
+                arrays.append(a)
+        (rank, up_offsets, up_targets, up_weights, up_middles,
+         down_offsets, down_targets, down_weights, down_middles) = arrays
+        return cls(rank,
+                   CSRGraph(up_offsets, up_targets, up_weights), up_middles,
+                   CSRGraph(down_offsets, down_targets, down_weights),
+                   down_middles)
+
+    def _edge_middle(self, graph, middles, i, j):
+        ''' The middle node of the edge i->j of `graph` '''
+        for k in xrange(graph.offsets[i], graph.offsets[i+1]):
+            if graph.targets[k] == j:
+                return middles[k]
+        raise KeyError("No edge from {} to {}".format(i, j))
+
+    def _unpack(self, u, x, path):
+        '''
+        Append the nodes after `u` on the path in the original graph
+        represented by the edge u->x of the hierarchy to `path`
+        '''
+        # use an explicit stack of edges to unpack, as nested shortcuts can be
+        # far deeper than the recursion limit
+        stack = [(u, x)]
+        while stack:
+            u, x = stack.pop()
+            if self.rank[u] < self.rank[x]:
+                middle = self._edge_middle(self.up, self.up_middles, u, x)
+            else:
+                middle = self._edge_middle(self.down, self.down_middles, x, u)
+            if middle == -1:
+                path.append(x)
+            else:
+                # u->x bypasses `middle`, so unpack u->middle first
+                stack.append((middle, x))
+                stack.append((u, middle))
+
+    def query(self, start, end):
+        '''
+        Same as `dijkstra(D, start, end)` for the graph `D` the hierarchy was
+        built from: return the cost and the path from `start` to `end`, or
+        raise a RuntimeError if there is no such path
+        '''
+        # index 0 is the upwards search from `start`, and index 1 is the
+        # (backwards) upwards search from `end`
+        graphs = (self.up, self.down)
+        costs = ({start: 0}, {end: 0})
+        previous = ({start: None}, {end: None})
+        pqs = (IndexedHeap(), IndexedHeap())
+        pqs[0].push(start, 0)
+        pqs[1].push(end, 0)
+        best, meeting = sys.maxint, None
+        while True:
+            # a search is finished once it can no longer improve on `best`
+            active = [d for d in (0, 1) if pqs[d] and pqs[d].peek()[0] < best]
+            if not active:
+                break
+            # advance the search with the lowest cost
+            d = min(active, key=lambda d: pqs[d].peek()[0])
+            cost_to_i, i = pqs[d].pop()
+            if i in costs[1-d] and cost_to_i + costs[1-d][i] < best:
+                best = cost_to_i + costs[1-d][i]
+                meeting = i
+            for j, weight in graphs[d].neighbours(i):
+                cost_with_i = cost_to_i + weight
+                if cost_with_i < costs[d].get(j, sys.maxint):
+                    costs[d][j] = cost_with_i
+                    previous[d][j] = i
+                    if j in pqs[d]:
+                        pqs[d].decrease_key(j, cost_with_i)
+                    else:
+                        pqs[d].push(j, cost_with_i)
+        if meeting is None:
+            # `end` is not reachable from `start`
+            raise RuntimeError("No path from {} to {} found".format(start, end))
+        # the path in the hierarchy, up to `meeting` and then down to `end`
+        ch_path = []
+        node = meeting
+        while node is not None:
+            ch_path.append(node)
+            node = previous[0][node]
+        ch_path.reverse()
+        node = previous[1][meeting]
+        while node is not None:
+            ch_path.append(node)
+            node = previous[1][node]
+        # unpack the shortcuts
+        path = [start]
+        for u, x in zip(ch_path, ch_path[1:]):
+            self._unpack(u, x, path)
+        return best, path
+
+    def cost(self, start, end):
+        ''' The cost of the shortest path from `start` to `end` '''
+        return self.query(start, end)[0]
+
+
+def main():
+    import tempfile
+    from sample_graphs import g2_data
+    g2, labels = g2_data
+    ch = ContractionHierarchy.build(g2)
+    print "Contraction order: {}".format(
+        " ".join(sorted(labels, key=lambda l: ch.rank[labels.index(l)])))
+    print "{} shortcuts".format(
+        sum(1 for m in ch.up_middles if m != -1) +
+        sum(1 for m in ch.down_middles if m != -1))
+    # round trip through a file
+    _, filepath = tempfile.mkstemp(suffix='.ch')
+    ch.save(filepath)
+    ch = ContractionHierarchy.load(filepath)
+    os.remove(filepath)
+    start, end = labels.index('a'), labels.index('c')
+    cost, path = ch.query(start, end)
+    print " -> ".join(labels[i] for i in path)
+    print "cost: {}".format(cost)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+'''
+Compressed Sparse Row (CSR) representation of a weighted graph.
+
+The vertices are the integers 0, 1, ..., V-1, and the edges leaving vertex `i`
+are stored contiguously: the targets of those edges are
+
+    targets[offsets[i]:offsets[i+1]]
+
+and their weights are the corresponding slice of `weights`. All three are flat
+arrays of machine numbers, so a graph with V vertices and E edges needs
+O(V + E) memory rather than the O(V^2) of an adjacency matrix, and iterating
+over the neighbours of a vertex is O(deg) rather than O(V).
+
+As with our adjacency matrices, an undirected graph is represented by storing
+every edge in both directions.
+
+For algorithms that only need the edges themselves, `EdgeList` is an even
+more compact array-backed representation.
+
+'''
+from array import array
+
+
+def _weight_typecode(weights):
+    ''' Use integer storage unless some weight is a float '''
+    for w in weights:
+        if isinstance(w, float):
+            return 'd'
+    return 'l'
+
+
+class CSRGraph:
+    '''
+    Args:
+        offsets: array of length V+1, where the edges leaving vertex `i` are
+                 at indices offsets[i] to offsets[i+1]-1 of `targets` and
+                 `weights`
+
+        targets: array of length E of the vertex each edge points to
+
+        weights: array of length E of the weight of each edge
+
+    Anything that modifies the arrays in place should also increment
+    `version`, so that results cached for the old graph are not reused.
+
+    '''
+    def __init__(self, offsets, targets, weights):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.version = 0
+
+    def __len__(self):
+        ''' The number of vertices in the graph '''
+        return len(self.offsets) - 1
+
+    def n_edges(self):
+        return len(self.targets)
+
+    def neighbours(self, i):
+        ''' Generate `(j, weight)` pairs for every edge i->j '''
+        targets, weights = self.targets, self.weights
+        for k in xrange(self.offsets[i], self.offsets[i+1]):
+            yield targets[k], weights[k]
+
+    def weight(self, i, j):
+        '''
+        Return the weight of the edge i->j, or 0 if there is no such edge
+        (as in an adjacency matrix)
+        '''
+        for k in xrange(self.offsets[i], self.offsets[i+1]):
+            if self.targets[k] == j:
+                return self.weights[k]
+        return 0
+
+    def edges(self):
+        ''' Generate every edge in the graph as a `(weight, i, j)` triple '''
+        for i in xrange(len(self)):
+            for j, w in self.neighbours(i):
+                yield w, i, j
+
+    def to_adjacency_matrix(self):
+        n = len(self)
+        D = [[0 for _ in xrange(n)] for _ in xrange(n)]
+        for w, i, j in self.edges():
+            D[i][j] = w
+        return D
+
+    @classmethod
+    def from_edges(cls, n, edges):
+        '''
+        Build a graph on `n` vertices from `edges`, a list of `(i, j, weight)`
+        triples for the edges i->j. Edges keep their relative order within
+        the neighbours of each vertex.
+        '''
+        offsets = array('l', [0]) * (n + 1)
+        # count the edges leaving each vertex ...
+        for i, _, _ in edges:
+            offsets[i+1] += 1
+        # ... and turn the counts into offsets
+        for i in xrange(n):
+            offsets[i+1] += offsets[i]
+        targets = array('l', [0]) * len(edges)
+        weights = array(_weight_typecode(e[2] for e in edges),
+                        [0]) * len(edges)
+        # next free slot for the edges of each vertex
+        fill = offsets[:-1]
+        for i, j, w in edges:
+            targets[fill[i]] = j
+            weights[fill[i]] = w
+            fill[i] += 1
+        return cls(offsets, targets, weights)
+
+    @classmethod
+    def from_adjacency_matrix(cls, D):
+        '''
+        Convert an adjacency matrix (as returned by the ADJACENCY_MATRIX
+        formats of `load.from_txt`), where 0 means no edge
+        '''
+        offsets = array('l', [0])
+        targets = array('l')
+        weights = array(_weight_typecode(w for row in D for w in row))
+        for row in D:
+            for j in xrange(len(row)):
+                if row[j] != 0:
+                    targets.append(j)
+                    weights.append(row[j])
+            offsets.append(len(targets))
+        return cls(offsets, targets, weights)
+
+    @classmethod
+    def from_adjacency_list(cls, graph, weight=1):
+        '''
+        Convert an unweighted adjacency list (as returned by the
+        ADJACENCY_LIST format of `load.from_txt`), giving every edge the
+        weight `weight`.
+
+        Returns the graph and the labels of its vertices, where vertex `i` is
+        the node `labels[i]` of `graph`.
+        '''
+        labels = sorted(graph)
+        index = {label: i for i, label in enumerate(labels)}
+        edges = [(index[node], index[neighbour], weight)
+                 for node in labels
+                 for neighbour in sorted(graph[node])]
+        return cls.from_edges(len(labels), edges), labels
+
+
+class EdgeList:
+    '''
+    A weighted graph on the vertices 0, 1, ..., V-1 as three parallel arrays
+    of length E, where the `k`th edge is sources[k]->targets[k] with weight
+    weights[k]. This is the most compact representation, and all that is
+    needed by algorithms that only look at edges one at a time (e.g.
+    Kruskal's algorithm), but finding the neighbours of a vertex requires
+    converting it to a `CSRGraph` first.
+
+    Args:
+        n: the number of vertices
+
+    '''
+    def __init__(self, n, sources, targets, weights):
+        self.n = n
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+    def __len__(self):
+        ''' The number of vertices in the graph '''
+        return self.n
+
+    def n_edges(self):
+        return len(self.sources)
+
+    def edges(self):
+        ''' Generate every edge in the graph as a `(weight, i, j)` triple '''
+        sources, targets, weights = self.sources, self.targets, self.weights
+        for k in xrange(len(sources)):
+            yield weights[k], sources[k], targets[k]
+
+    def to_csr(self, undirected=False):
+        '''
+        Convert to a `CSRGraph`. If `undirected`, every edge i->j is taken to
+        also be an edge j->i.
+        '''
+        edges = [(i, j, w) for w, i, j in self.edges()]
+        if undirected:
+            edges.extend([(j, i, w) for i, j, w in edges])
+        return CSRGraph.from_edges(self.n, edges)
+
+    @classmethod
+    def from_graph(cls, graph):
+        ''' Convert an adjacency matrix or `CSRGraph` '''
+        sources, targets = array('l'), array('l')
+        weights = []
+        for w, i, j in edges(graph):
+            sources.append(i)
+            targets.append(j)
+            weights.append(w)
+        return cls(len(graph), sources, targets,
+                   array(_weight_typecode(weights), weights))
+
+
+def neighbours(graph, i):
+    '''
+    Generate `(j, weight)` pairs for every edge i->j of `graph`, which may be
+    either an adjacency matrix or a `CSRGraph`
+    '''
+    if isinstance(graph, CSRGraph):
+        return graph.neighbours(i)
+    row = graph[i]
+    return ((j, row[j]) for j in xrange(len(row)) if row[j] != 0)
+
+
+def edges(graph):
+    '''
+    Generate every edge of `graph`, which may be an adjacency matrix, a
+    `CSRGraph` or an `EdgeList`, as a `(weight, i, j)` triple
+    '''
+    if isinstance(graph, (CSRGraph, EdgeList)):
+        return graph.edges()
+    return ((graph[i][j], i, j)
+            for i in xrange(len(graph))
+            for j in xrange(len(graph))
+            if graph[i][j] != 0)
+
+
+def reverse(graph):
+    '''
+    Return `graph` (an adjacency matrix or a `CSRGraph`) with the direction of
+    every edge reversed, in the same representation. For undirected graphs this
+    is of course just a copy of `graph`.
+    '''
+    if isinstance(graph, CSRGraph):
+        return CSRGraph.from_edges(len(graph),
+                                   [(j, i, w) for w, i, j in graph.edges()])
+    return [list(column) for column in zip(*graph)]
+
+
+def main():
+    from sample_graphs import g2_data, g4_data
+    g2, labels = g2_data
+    g4, _ = g4_data
+    csr = CSRGraph.from_adjacency_matrix(g2)
+    print "{} vertices, {} edges".format(len(csr), csr.n_edges())
+    print "Same as sparse file: {}".format(
+        csr.to_adjacency_matrix() == g4.to_adjacency_matrix())
+    for i in xrange(len(csr)):
+        print "{}: {}".format(labels[i], ",".join(
+            "{} {}".format(labels[j], w) for j, w in csr.neighbours(i)))
+
+
+if __name__ == '__main__':
+    main()
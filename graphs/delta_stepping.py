@@ -0,0 +1,188 @@
+'''
+Delta-stepping single source shortest paths.
+
+Dijkstra's algorithm settles nodes strictly one at a time. Delta-stepping
+instead keeps nodes in "buckets" of width `delta` by their tentative cost,
+and settles a whole bucket at once: every node in the lowest bucket relaxes
+its edges in one batch, which may add more nodes to the same bucket, and this
+repeats until the bucket stays empty.
+
+Edges are split into "light" edges (weight <= delta), which can put nodes
+back into the current bucket, and "heavy" edges, which never can, so heavy
+edges only need relaxing once per bucket, after it has been emptied.
+
+Since all the relaxations of a batch are independent, generating them can be
+split between worker processes, though every relaxation then has to be sent
+back from the workers, which costs about as much as generating it. A large
+`delta` means fewer, bigger batches (approaching the Bellman-Ford algorithm)
+and a small `delta` means more, smaller batches (approaching Dijkstra's
+algorithm).
+
+'''
+import multiprocessing
+import sys
+
+from csr import CSRGraph, edges
+
+
+# the light and heavy graphs of the current worker process
+_worker_graphs = None
+
+
+def _init_worker(light, heavy):
+    global _worker_graphs
+    _worker_graphs = (light, heavy)
+
+
+def _requests(batch, graph=None):
+    '''
+    Generate the relaxations for `batch`, a list of `(node, cost)` pairs, over
+    the edges of `graph` as a list of `(neighbour, cost, node)` triples. In a
+    worker process, `batch` is instead a `(batch, heavy)` pair and `graph` is
+    the light or heavy graph the worker was initialized with.
+    '''
+    if graph is None:
+        batch, heavy = batch
+        graph = _worker_graphs[heavy]
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    requests = []
+    for node, cost in batch:
+        for k in xrange(offsets[node], offsets[node+1]):
+            requests.append((targets[k], cost + weights[k], node))
+    return requests
+
+
+def _split(D, delta):
+    ''' Split the edges of `D` into light and heavy `CSRGraph`s '''
+    light, heavy = [], []
+    for weight, i, j in edges(D):
+        (light if weight <= delta else heavy).append((i, j, weight))
+    return (CSRGraph.from_edges(len(D), light),
+            CSRGraph.from_edges(len(D), heavy))
+
+
+def delta_stepping(D, source, delta=None, processes=1, min_batch=10000):
+    '''
+    Find the shortest paths from `source` to every node in the graph `D`,
+    with the same costs as `shortest_path_tree(D, source)`.
+
+    D: adjacency matrix or `CSRGraph`, with non-negative weights
+
+    delta: width of each bucket (by default, the average edge weight)
+
+    processes: number of worker processes to split large batches between.
+               By default there are none, as the workers only pay off with a
+               core each and batches of many thousands of nodes: on a single
+               core, 4 processes took 4.8s on a graph of 10^6 edges, against
+               3.5s with no workers at all
+
+    min_batch: batches with fewer nodes than this are always processed in the
+               calling process, as it would not be worth sending them to the
+               workers
+
+    Returns: `costs`, `previous`, as for `shortest_path_tree`. The costs are
+             the same, but where two shortest paths to a node tie, its
+             parent in `previous` may be a different one
+
+    '''
+    n = len(D)
+    if delta is None:
+        weights = [w for w, _, _ in edges(D)]
+        delta = float(sum(weights)) / len(weights) if weights else 1
+    graphs = _split(D, delta)
+    costs = [sys.maxint for _ in xrange(n)]
+    previous = [None for _ in xrange(n)]
+    # map from bucket index to the set of nodes in that bucket
+    buckets = {}
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, _init_worker, graphs)
+
+    def _relax(requests):
+        for node, cost, parent in requests:
+            if cost < costs[node]:
+                if costs[node] != sys.maxint:
+                    # move the node out of its old bucket
+                    buckets[int(costs[node] / delta)].discard(node)
+                costs[node] = cost
+                previous[node] = parent
+                buckets.setdefault(int(cost / delta), set()).add(node)
+
+    def _batch_requests(nodes, heavy):
+        batch = [(node, costs[node]) for node in nodes]
+        if pool is None or len(batch) < min_batch:
+            return _requests(batch, graphs[heavy])
+        # split the batch evenly between the workers
+        size = -(-len(batch) // processes)
+        chunks = [(batch[i:i+size], heavy)
+                  for i in xrange(0, len(batch), size)]
+        return [request for requests in pool.map(_requests, chunks)
+                for request in requests]
+
+    try:
+        _relax([(source, 0, None)])
+        while buckets:
+            i = min(buckets)
+            # nodes settled in this bucket
+            settled = []
+            while buckets.get(i):
+                nodes = list(buckets[i])
+                buckets[i] = set()
+                settled.extend(nodes)
+                # light edges may add nodes back into bucket i
+                _relax(_batch_requests(nodes, 0))
+            del buckets[i]
+            # heavy edges only reach later buckets
+            _relax(_batch_requests(settled, 1))
+            # drop any buckets that were emptied by moving nodes out of them
+            for j in [j for j, nodes in buckets.iteritems() if not nodes]:
+                del buckets[j]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return costs, previous
+
+
+def _random_graph(n, m, max_weight=100, seed=0):
+    ''' A random directed `CSRGraph` with `n` nodes and `m` edges '''
+    import random
+    rng = random.Random(seed)
+    return CSRGraph.from_edges(n, [(rng.randrange(n), rng.randrange(n),
+                                    rng.randint(1, max_weight))
+                                   for _ in xrange(m)])
+
+
+def benchmark(n, m, processes=1):
+    ''' Time `delta_stepping` against Dijkstra on a random graph '''
+    import time
+    from dijkstra import shortest_path_tree
+    graph = _random_graph(n, m)
+    t = time.time()
+    expected, _ = shortest_path_tree(graph, 0)
+    dijkstra_time = time.time() - t
+    t = time.time()
+    costs, _ = delta_stepping(graph, 0, processes=processes)
+    delta_time = time.time() - t
+    assert costs == expected
+    print "{} nodes, {} edges: dijkstra {:.2f}s, delta-stepping {:.2f}s " \
+          "({} processes, {} cpus)".format(n, m, dijkstra_time, delta_time,
+                                          processes,
+                                          multiprocessing.cpu_count())
+
+
+def main():
+    from sample_graphs import g2_data
+    g2, labels = g2_data
+    costs, previous = delta_stepping(g2, labels.index('a'), delta=3)
+    for label, cost, parent in zip(labels, costs, previous):
+        print "{}: cost {} via {}".format(
+            label, cost, labels[parent] if parent is not None else '-')
+    benchmark(10**4, 10**5)
+    benchmark(10**5, 10**6)
+    # the workers only help with a core each
+    benchmark(10**5, 10**6, processes=4)
+
+
+if __name__ == '__main__':
+    main()
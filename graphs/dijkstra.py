@@ -1,59 +1,60 @@
+import os
 import sys
-import heapq
+from collections import OrderedDict
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.heap import IndexedHeap
+from csr import neighbours, reverse
 
-def dijkstra(D, start, end):
-    '''
-    Find the shortest path in a weighted graph from a source node to a target
-    node. Will return RuntimeError if no path is found (i.e. could occur if the
-    graph is disconnected)
-
-    D: weighted adjacency matrix representation of the graph, where `D[i][j]`
-       is the cost to travel from node `i` to node `j`
-
-    start: index of the source node
 
-    end: index of the target node
+def _search(D, start, end=None):
+    '''
+    Run Dijkstra's algorithm on `D` from node `start`, stopping as soon as
+    the node `end` is settled (or once every reachable node is settled if
+    `end` is None).
 
+    Returns the `costs` and `previous` lists, where `costs[i]` is the cost
+    of the shortest path found to node `i` (sys.maxint if it was never
+    reached) and `previous[i]` is the node before `i` on that path, as well
+    as the list of which nodes were settled.
     '''
     # keep track of where we've come from
-    previous = [None for _ in D]
-    # create a list of cost, index pairs to serve as pointers to items in
-    # the priority queue, so that we can modify items in the pq in place
-    # distance to start node is 0, all others is "infinity"
-    costs = [[sys.maxint, i] for i in xrange(len(D))]
-    costs[start][0] = 0
-    # initialize the priority queue
-    # each element in `pq` will be a reference to the corresponding element in
-    # `costs`
-    pq = costs[:]
-    heapq.heapify(pq)
+    previous = [None for _ in xrange(len(D))]
+    # best known cost to each node, "infinity" until we reach it
+    costs = [sys.maxint for _ in xrange(len(D))]
+    costs[start] = 0
+    # nodes whose shortest path is known
+    settled = [False for _ in xrange(len(D))]
+    # the priority queue only ever holds nodes we have reached but not yet
+    # settled, and its indexing lets us decrease their costs in place
+    pq = IndexedHeap()
+    pq.push(start, 0)
     while pq:
         # get the next lowest cost node from the priority queue
-        cost_to_i, i = heapq.heappop(pq)
+        cost_to_i, i = pq.pop()
+        settled[i] = True
         if i == end:
             # we arrived at the optimal solution
             break
-        if cost_to_i == sys.maxint:
-            # `end` is not reachable from `start`
-            raise RuntimeError("No path from {} to {} found".format(start, end))
         # explore the neighbors of this node
-        modified = False
-        for j in xrange(len(D)):
-            if D[i][j] != 0:
+        for j, weight in neighbours(D, i):
+            if not settled[j]:
                 # i and j are adjacent
-                cost_with_i = cost_to_i + D[i][j]
-                if cost_with_i < costs[j][0]:
+                cost_with_i = cost_to_i + weight
+                if cost_with_i < costs[j]:
                     # update with the new cost
-                    costs[j][0] = cost_with_i
+                    costs[j] = cost_with_i
                     previous[j] = i
-                    modified = True
-        if modified:
-            # maintain heap structure. A descrease_key() operation in the above
-            # for-loop would be more efficient than heapify()
-            heapq.heapify(pq)
-    # Retrieve the cost from when we broke
-    cost = cost_to_i
+                    if j in pq:
+                        pq.decrease_key(j, cost_with_i)
+                    else:
+                        pq.push(j, cost_with_i)
+    return costs, previous, settled
+
+
+def _reconstruct_path(previous, end):
+    ''' Follow `previous` back from `end` to get the path to `end` '''
     # reconstruct the path in reversed order
     path = []
     prev = end
@@ -61,7 +62,175 @@ def dijkstra(D, start, end):
         path.append(prev)
         prev = previous[prev]
     path.reverse()
-    return cost, path
+    return path
+
+
+def dijkstra(D, start, end):
+    '''
+    Find the shortest path in a weighted graph from a source node to a target
+    node. Will return RuntimeError if no path is found (i.e. could occur if the
+    graph is disconnected)
+
+    D: weighted adjacency matrix representation of the graph, where `D[i][j]`
+       is the cost to travel from node `i` to node `j`, or the same graph as a
+       `CSRGraph`
+
+    start: index of the source node
+
+    end: index of the target node
+
+    '''
+    costs, previous, settled = _search(D, start, end)
+    if not settled[end]:
+        # `end` is not reachable from `start`
+        raise RuntimeError("No path from {} to {} found".format(start, end))
+    return costs[end], _reconstruct_path(previous, end)
+
+
+def _bidirectional_search(D, R, start, end, potential=None):
+    '''
+    Search for the shortest path from `start` to `end` simultaneously forwards
+    from `start` in `D` and backwards from `end` in `R`, the reverse of `D`.
+
+    If given, `potential[i]` is added to the priority of node `i` in the
+    forwards search, and subtracted from it in the backwards search. For this
+    to be correct the potential must be consistent in both directions, which
+    is the case for the average of a consistent heuristic to `end` and
+    (minus) a consistent heuristic to `start`.
+
+    Returns the cost and the path.
+    '''
+    if start == end:
+        return 0, [start]
+    n = len(D)
+    if potential is None:
+        potential = [0 for _ in xrange(n)]
+    # index 0 is the forwards search and index 1 the backwards search
+    graphs = (D, R)
+    sign = (1, -1)
+    costs = ([sys.maxint for _ in xrange(n)], [sys.maxint for _ in xrange(n)])
+    previous = ([None for _ in xrange(n)], [None for _ in xrange(n)])
+    settled = ([False for _ in xrange(n)], [False for _ in xrange(n)])
+    pqs = (IndexedHeap(), IndexedHeap())
+    costs[0][start] = 0
+    costs[1][end] = 0
+    pqs[0].push(start, potential[start])
+    pqs[1].push(end, -potential[end])
+    # cost of the best path found so far, and where its two halves meet
+    best, meeting = sys.maxint, None
+    while pqs[0] and pqs[1]:
+        # neither search can find a path cheaper than the sum of the lowest
+        # priorities (the potentials of the two halves cancel out), so once
+        # this reaches `best` we are done
+        if pqs[0].peek()[0] + pqs[1].peek()[0] >= best:
+            break
+        # advance whichever search has the smaller frontier
+        d = 0 if len(pqs[0]) <= len(pqs[1]) else 1
+        _, i = pqs[d].pop()
+        settled[d][i] = True
+        for j, weight in neighbours(graphs[d], i):
+            if settled[d][j]:
+                continue
+            cost_with_i = costs[d][i] + weight
+            if cost_with_i < costs[d][j]:
+                costs[d][j] = cost_with_i
+                previous[d][j] = i
+                priority = cost_with_i + sign[d] * potential[j]
+                if j in pqs[d]:
+                    pqs[d].decrease_key(j, priority)
+                else:
+                    pqs[d].push(j, priority)
+            # check if this edge joins the two searches in a cheaper path
+            if costs[1-d][j] != sys.maxint and \
+               cost_with_i + costs[1-d][j] < best:
+                best = cost_with_i + costs[1-d][j]
+                meeting = j
+    if meeting is None:
+        # `end` is not reachable from `start`
+        raise RuntimeError("No path from {} to {} found".format(start, end))
+    # the forwards half of the path leads up to `meeting` ...
+    path = _reconstruct_path(previous[0], meeting)
+    # ... and the backwards half leads from `meeting` to `end`
+    node = previous[1][meeting]
+    while node is not None:
+        path.append(node)
+        node = previous[1][node]
+    return best, path
+
+
+def bidirectional_dijkstra(D, start, end, R=None):
+    '''
+    Same as `dijkstra(D, start, end)`, but searching from both `start` and
+    `end` at once, which typically settles far fewer nodes.
+
+    R: the graph `D` with its edges reversed. If not given it will be computed,
+       so pass `D` itself for undirected graphs, or a precomputed reverse
+       when making many queries on the same directed graph
+
+    '''
+    if R is None:
+        R = reverse(D)
+    return _bidirectional_search(D, R, start, end)
+
+
+def shortest_path_tree(D, source):
+    '''
+    Find the shortest paths from `source` to every node in the graph `D`
+    (in the same format as for `dijkstra`).
+
+    Returns: `costs`, `previous`, where `costs[i]` is the cost of the
+             shortest path from `source` to node `i` (sys.maxint if `i` is not
+             reachable), and `previous[i]` is the node before `i` on that path
+             (None for `source` and unreachable nodes)
+
+    '''
+    costs, previous, _ = _search(D, source)
+    return costs, previous
+
+
+class ShortestPathCache:
+    '''
+    A least recently used cache of shortest path trees, so that repeated
+    queries from the same few sources each cost O(path length) rather than a
+    full run of Dijkstra's algorithm.
+
+    Trees are keyed on the graph, its `version` attribute (if it has one, as
+    `CSRGraph`s do) and the source node, so bumping the version of a graph
+    after modifying it will stop stale trees from being used. Adjacency
+    matrices have no version, so call `clear()` after modifying one.
+
+    Args:
+        maxsize: the maximum number of trees to keep
+
+    '''
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+
+    def clear(self):
+        self.trees.clear()
+
+    def tree(self, D, source):
+        ''' Return the (possibly cached) `shortest_path_tree(D, source)` '''
+        key = (id(D), getattr(D, 'version', 0), source)
+        entry = self.trees.pop(key, None)
+        if entry is None or entry[0] is not D:
+            # not cached (or the id belongs to a graph that has been freed)
+            entry = (D, shortest_path_tree(D, source))
+            if len(self.trees) >= self.maxsize:
+                # evict the least recently used tree
+                self.trees.popitem(last=False)
+        # (re)insert as the most recently used tree
+        self.trees[key] = entry
+        return entry[1]
+
+    def path(self, D, start, end):
+        ''' Same as `dijkstra(D, start, end)`, but using the cached tree '''
+        costs, previous = self.tree(D, start)
+        if costs[end] == sys.maxint:
+            # `end` is not reachable from `start`
+            raise RuntimeError("No path from {} to {} found".format(start, end))
+        return costs[end], _reconstruct_path(previous, end)
 
 
 def main():
@@ -73,6 +242,16 @@ def main():
     labeled_path = [g2_labels[i] for i in path]
     print " -> ".join(labeled_path)
     print "cost: {}".format(cost)
+    # the graph is undirected so it is its own reverse
+    cost, path = bidirectional_dijkstra(g2, startidx, endidx, R=g2)
+    print "bidirectional: {} (cost {})".format(
+        " -> ".join(g2_labels[i] for i in path), cost)
+    # answer queries to every node from the same source using one search
+    cache = ShortestPathCache()
+    for label in g2_labels:
+        cost, path = cache.path(g2, startidx, g2_labels.index(label))
+        print "{}: {} (cost {})".format(
+            label, " -> ".join(g2_labels[i] for i in path), cost)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+'''
+Many-to-many shortest path costs: the cost of the shortest path from each of a
+list of sources to each of a list of targets, as needed for origin-destination
+cost matrices.
+
+Each row of the matrix is one run of Dijkstra's algorithm, and rows are
+independent, so they are split across a pool of worker processes. The graph
+is handed to the workers once when the pool starts rather than once per task.
+On platforms that fork (e.g. Linux) the workers then share the parent's copy
+of the graph, and for a `CSRGraph` the flat arrays holding the edges are never
+written to, so their memory is shared for the lifetime of the pool rather than
+copied into every worker.
+
+'''
+import multiprocessing
+import sys
+from array import array
+
+from dijkstra import shortest_path_tree
+
+
+# the graph and targets of the current worker process
+_worker_graph = None
+_worker_targets = None
+
+
+def _init_worker(graph, targets):
+    global _worker_graph, _worker_targets
+    _worker_graph = graph
+    _worker_targets = targets
+
+
+def _row(source, graph=None, targets=None):
+    '''
+    Costs from `source` to each of `targets` in `graph` (by default the graph
+    and targets the worker was initialized with), as an array of doubles
+    '''
+    if graph is None:
+        graph, targets = _worker_graph, _worker_targets
+    costs, _ = shortest_path_tree(graph, source)
+    inf = float('inf')
+    return array('d', (inf if costs[t] == sys.maxint else costs[t]
+                       for t in targets))
+
+
+def distance_matrix(graph, sources, targets=None, processes=None,
+                    chunksize=1):
+    '''
+    Compute the cost of the shortest path from every node in `sources` to
+    every node in `targets`.
+
+    graph: adjacency matrix or `CSRGraph`, as for `dijkstra`
+
+    sources, targets: lists of node indices (by default, `targets` is every
+                      node in the graph)
+
+    processes: number of worker processes (by default, one per cpu). With 1
+               process, everything is computed in the calling process
+
+    chunksize: number of sources sent to a worker at a time
+
+    Returns: a list with one row per source, where row `i` is an array of
+             doubles whose `j`th entry is the cost from `sources[i]` to
+             `targets[j]` (infinity if there is no path)
+
+    '''
+    if targets is None:
+        targets = range(len(graph))
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(sources))
+    if processes <= 1:
+        return [_row(source, graph, targets) for source in sources]
+    pool = multiprocessing.Pool(processes, _init_worker, (graph, targets))
+    try:
+        # `imap` keeps the rows in the order of `sources`
+        return list(pool.imap(_row, sources, chunksize))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main():
+    from sample_graphs import g2_data
+    from csr import CSRGraph
+    g2, labels = g2_data
+    graph = CSRGraph.from_adjacency_matrix(g2)
+    sources = range(len(labels))
+    matrix = distance_matrix(graph, sources, processes=2)
+    print "  " + " ".join("{:>3}".format(l) for l in labels)
+    for source, row in zip(sources, matrix):
+        print labels[source] + " " + " ".join("{:3.0f}".format(c)
+                                              for c in row)
+
+
+if __name__ == '__main__':
+    main()
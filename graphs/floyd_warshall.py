@@ -0,0 +1,96 @@
+'''
+Floyd-Warshall algorithm for the shortest paths between all pairs of nodes in
+a weighted graph.
+
+After considering nodes 0, 1, ..., k-1 as possible intermediate nodes,
+`dist[i][j]` holds the cost of the shortest path from i to j using only those
+intermediate nodes. Considering node k as well, the shortest path from i to j
+either avoids k or goes i -> ... -> k -> ... -> j, so
+
+    dist[i][j] = min(dist[i][j], dist[i][k] + dist[k][j])
+
+This is O(V^3), against O(V * E log(V)) for V runs of Dijkstra's algorithm,
+but the inner loop is so simple that it wins for dense graphs. Each step k
+updates whole rows at a time: row i is compared elementwise against row k
+shifted by dist[i][k], and rows that cannot reach k are skipped entirely.
+
+'''
+import sys
+from itertools import izip
+
+from csr import edges
+
+
+def floyd_warshall(D):
+    '''
+    Find the cost of the shortest path between every pair of nodes of `D`, an
+    adjacency matrix (0 meaning no edge) or a `CSRGraph`.
+
+    Returns: `dist`, `nxt`, where `dist[i][j]` is the cost of the shortest path
+             from `i` to `j` (sys.maxint if there is none), and `nxt[i][j]` is
+             the node after `i` on that path (None if there is none), to be
+             used with `reconstruct_path`
+
+    Raises a ValueError if the graph has a negative cycle.
+
+    '''
+    n = len(D)
+    dist = [[sys.maxint for _ in xrange(n)] for _ in xrange(n)]
+    nxt = [[None for _ in xrange(n)] for _ in xrange(n)]
+    for i in xrange(n):
+        dist[i][i] = 0
+        nxt[i][i] = i
+    for weight, i, j in edges(D):
+        if i != j and weight < dist[i][j]:
+            dist[i][j] = weight
+            nxt[i][j] = j
+    for k in xrange(n):
+        row_k = dist[k]
+        # only the entries of row k we can actually travel through
+        reachable_k = [(j, d_kj) for j, d_kj in enumerate(row_k)
+                       if d_kj != sys.maxint]
+        for i in xrange(n):
+            d_ik = dist[i][k]
+            if d_ik == sys.maxint or i == k:
+                # there is no path from i through k
+                continue
+            row_i, nxt_i = dist[i], nxt[i]
+            improved = [(j, d_ik + d_kj) for j, d_kj in reachable_k
+                        if d_ik + d_kj < row_i[j]]
+            nxt_ik = nxt_i[k]
+            for j, d_ij in improved:
+                row_i[j] = d_ij
+                nxt_i[j] = nxt_ik
+    for i in xrange(n):
+        if dist[i][i] < 0:
+            raise ValueError("Graph contains a negative cycle")
+    return dist, nxt
+
+
+def reconstruct_path(nxt, start, end):
+    '''
+    Return the shortest path from `start` to `end` using the `nxt` matrix from
+    `floyd_warshall`, or None if there is no path
+    '''
+    if nxt[start][end] is None:
+        return None
+    path = [start]
+    while start != end:
+        start = nxt[start][end]
+        path.append(start)
+    return path
+
+
+def main():
+    from sample_graphs import g2_data
+    g2, labels = g2_data
+    dist, nxt = floyd_warshall(g2)
+    print "  " + " ".join("{:>3}".format(l) for l in labels)
+    for label, row in izip(labels, dist):
+        print label + " " + " ".join("{:3}".format(c) for c in row)
+    start, end = labels.index('a'), labels.index('c')
+    print " -> ".join(labels[i] for i in reconstruct_path(nxt, start, end))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,80 +8,53 @@ ability to check if two sets are disjoint in essentially O(1) time
 will result in a cycle in an efficient manner)
 
 '''
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.union_find import UnionFind
+from csr import EdgeList
+
 
 def kruskal(graph):
     '''
     Kruskal's Algorithm to return the MST of graph `graph`
 
-    graph: adjacency matrix representation of a graph
+    graph: adjacency matrix representation of a graph, a `CSRGraph`, or an
+           `EdgeList` (the most efficient, as it is used directly)
 
     Returns: a list of edges in the graph, where an edge is a 3 element
              tuple (weight, vertex1, vertex2)
     '''
-    # use integers to represent each vertex
-    vertices = [i for i in range(len(graph))]
+    if not isinstance(graph, EdgeList):
+        # only edges that are actually in the graph are considered, so for a
+        # `CSRGraph` this is O(E) rather than O(V^2)
+        graph = EdgeList.from_graph(graph)
+    n_vertices = len(graph)
+    sources, targets, weights = graph.sources, graph.targets, graph.weights
     # initialize each vertex in the graph to belong to its own set
-    parent = [i for i in vertices]
-    # since each vertex is initialized in its own set, which we
-    # represent as trees, their ranks (depth) are initialized to 0
-    rank = [0 for _ in vertices]
-
-    def _find(v):
-        '''
-        Return the "representative/root" node of the set/tree that `v`
-        belongs to.
-        Simultaneously applies path compression, connecting every node
-        in the set/tree to the root node.
-        '''
-        if parent[v] != v:
-            parent[v] = _find(parent[v])
-        return parent[v]
-
-    def _union(v1, v2):
-        '''
-        If v1 and v2 are in the same set, join the sets and update the
-        rank of the new set appriately
-        '''
-        v1root = _find(v1)
-        v2root = _find(v2)
-        if v1root != v2root:
-            if rank[v1root] < rank[v2root]:
-                parent[v1root] = v2root
-            else:
-                parent[v2root] = v1root
-                if rank[v1root] == rank[v2root]:
-                    rank[v1root] += 1
+    sets = UnionFind(n_vertices)
 
-    # we need to sort all of the edges by their weights
-    # can insert them into a heap and then pop them off, but here
-    # we'll just reverse sort them in a list and pop from the end
-    edges = []
-    for i in range(len(graph)):
-        for j in range(len(graph)):
-            # invalid weights in the graph are currently represented
-            # by 0, so change them to "infinity"
-            weight = graph[i][j] or sys.maxint
-            edges.append((weight, i, j))
-    edges.sort(reverse=True)
+    # we need to sort all of the edges by their weights. Rather than sorting
+    # the edges themselves, sort their indices, so that we never need to
+    # build a tuple for every edge
+    order = sorted(xrange(len(weights)), key=weights.__getitem__)
     # `mst` will store the edges in our MST
     mst = []
     # Begin Kruskal
-    n_vertices = len(vertices)
-    # if our graph has n vertices, we stop when our tree has n-1 edges
-    while len(mst) < n_vertices-1:
-        e = edges.pop()
-        if _find(e[1]) != _find(e[2]):
-            # add the edges to the same set and add the edge to
-            # our tree
-            _union(e[1], e[2])
-            mst.append(e)
+    for k in order:
+        # if our graph has n vertices, we stop when our tree has n-1 edges
+        if len(mst) == n_vertices-1:
+            break
+        if sets.union(sources[k], targets[k]):
+            # the edge joined two different sets, so add the edge to our tree
+            mst.append((weights[k], sources[k], targets[k]))
     return mst
 
 
 def main():
-    from sample_graphs import g2_data
+    from sample_graphs import g2_data, g5_data
     adj_matrix, labels = g2_data
     mst = kruskal(adj_matrix)
     weight = sum(map(lambda x: x[0], mst))
@@ -89,6 +62,10 @@ def main():
     for edge in mst:
         print labels[edge[1]] + "->" + labels[edge[2]]
     print "MST Weight: {}".format(weight)
+    # the same graph, stored as an edge list
+    edge_list, labels = g5_data
+    print "MST Weight (edge list): {}".format(
+        sum(edge[0] for edge in kruskal(edge_list)))
 
 
 if __name__ == '__main__':
@@ -1,8 +1,15 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
+import os
+import sys
+from array import array
 from collections import deque
 from copy import deepcopy
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.union_find import UnionFind
+
 
 class Maze:
 
@@ -92,6 +99,22 @@ class Maze:
                         if self._isvalid((i, j+1)):
                             self._makeedge((i, j), (i, j+1))
 
+    def is_solvable(self):
+        '''
+        Check if there is any path from the start to the end, without
+        searching for one, by merging the regions of adjacent valid squares
+        '''
+        nrows = len(self.grid)
+        ncols = len(self.grid[0])
+        # number the squares row by row
+        regions = UnionFind(nrows * ncols)
+        regions.union_many(
+            (i * ncols + j, nbr_i * ncols + nbr_j)
+            for (i, j) in self.graph
+            for (nbr_i, nbr_j) in self.graph[(i, j)])
+        return regions.connected(self.start[0] * ncols + self.start[1],
+                                 self.end[0] * ncols + self.end[1])
+
     def solve(self):
         '''
         Find a path in a BFS manner using the graph, start node and end node
@@ -158,11 +181,145 @@ class Maze:
         print "Actions taken: {}".format(self.actions_taken)
 
 
+class GridMaze:
+    '''
+    The same as `Maze`, but searching the grid of the maze directly rather
+    than first converting it into a graph, so that even mazes of 10k x 10k
+    squares can be solved.
+
+    The grid is kept as a single bytearray, one byte per square, with a
+    border of invalid squares added around it: a row above and below, and a
+    column to the right of every row (which is also to the left of the next
+    row). A square is then just an index into the grid, its neighbours are
+    the squares 1 and `width` away, and none of them ever falls off the grid.
+    The search stores the parent of every square in a preallocated array of
+    integers, rather than Python objects for every square.
+
+    '''
+    valid_actions = Maze.valid_actions
+    blocks = Maze.blocks
+
+    def __init__(self, mazefile):
+        self.mazefile = mazefile
+        self.grid = None
+        self.width = None
+        self.nrows = None
+        self.start = None
+        self.end = None
+        self.path = None
+        self.actions_taken = None
+        self._load()
+
+    def _load(self):
+        '''
+        Read the maze file a row at a time into the padded grid, and find the
+        start and end squares. Raises ValueError if the maze is empty, if the
+        rows are not all the same length, or if there is no start or end.
+        '''
+        invalid = self.blocks['invalid']
+        self.grid = bytearray()
+        self.nrows = 0
+        with open(self.mazefile, 'rb') as f:
+            for line in f:
+                row = line.strip()
+                if not row:
+                    continue
+                if self.width is None:
+                    self.width = len(row) + 1
+                    # the border above the maze
+                    self.grid.extend(invalid * self.width)
+                elif len(row) != self.width - 1:
+                    # a row of a different length would shift every square
+                    # after it in the grid
+                    raise ValueError(
+                        "Row {} of {} has {} squares, but row 0 has {}".format(
+                            self.nrows, self.mazefile, len(row),
+                            self.width - 1))
+                self.grid.extend(row)
+                self.grid.extend(invalid)
+                self.nrows += 1
+        if self.width is None:
+            raise ValueError("{} has no rows".format(self.mazefile))
+        # the border below the maze
+        self.grid.extend(invalid * (self.width + 1))
+        self.start = self.grid.find(self.blocks['start'])
+        self.end = self.grid.find(self.blocks['end'])
+        for name, square in (('start', self.start), ('end', self.end)):
+            if square == -1:
+                raise ValueError("{} has no {} square ({!r})".format(
+                    self.mazefile, name, self.blocks[name]))
+
+    def coordinates(self, square):
+        ''' The (i, j) coordinates in the maze file of `square` '''
+        i, j = divmod(square, self.width)
+        return i - 1, j
+
+    def solve(self):
+        '''
+        Find a shortest path from the start to the end with a BFS, and return
+        it as a list of (i, j) coordinates, or None if there is no path
+        '''
+        width = self.width
+        # squares are marked invalid in this copy of the grid once they have
+        # been seen, so one check tells us whether to visit a square
+        unseen = bytearray(self.grid)
+        invalid = ord(self.blocks['invalid'])
+        parent = array('i', [-1]) * len(self.grid)
+        # the squares in the order they are seen, which serves as the queue
+        queue = array('i', [self.start])
+        unseen[self.start] = invalid
+        head = 0
+        end = self.end
+        while head < len(queue) and parent[end] == -1:
+            current = queue[head]
+            head += 1
+            for neighbour in (current - width, current - 1, current + 1,
+                              current + width):
+                if unseen[neighbour] != invalid:
+                    unseen[neighbour] = invalid
+                    parent[neighbour] = current
+                    queue.append(neighbour)
+        if parent[end] == -1 and end != self.start:
+            self.path = self.actions_taken = None
+            return None
+        # follow the parents back from the end
+        squares = [end]
+        while squares[-1] != self.start:
+            squares.append(parent[squares[-1]])
+        squares.reverse()
+        actions = {-width: self.valid_actions['up'],
+                   width: self.valid_actions['down'],
+                   -1: self.valid_actions['left'],
+                   1: self.valid_actions['right']}
+        self.actions_taken = ' '.join(actions[b - a]
+                                      for a, b in zip(squares, squares[1:]))
+        self.path = map(self.coordinates, squares)
+        return self.path
+
+    def print_solution(self):
+        '''
+        Print the maze with the solution indicated by '*'s
+        '''
+        solved_grid = bytearray(self.grid)
+        for i, j in self.path:
+            solved_grid[(i + 1) * self.width + j] = self.blocks['path']
+        rows = (solved_grid[(i + 1) * self.width:(i + 2) * self.width - 1]
+                for i in range(self.nrows))
+        solution_str = '\n'.join(str(row) for row in rows)
+        print "Solved Maze:\n\n{}\n".format(solution_str)
+        print "Actions taken: {}".format(self.actions_taken)
+
+
 def main():
     mazefile = "sample_graphs/maze.txt"
     maze = Maze(mazefile)
+    print "Solvable: {}".format(maze.is_solvable())
     maze.solve()
     maze.print_solution()
+    # the grid-native version finds the same path
+    grid_maze = GridMaze(mazefile)
+    grid_maze.solve()
+    grid_maze.print_solution()
 
 
 if __name__ == '__main__':
@@ -8,18 +8,26 @@ the mst set the vertex not currently in it.
 
 '''
 import heapq
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from data_structures.heap import IndexedHeap
+from csr import neighbours
+
 
 def _gen_neighbours(vertex, g, mst_set):
     '''
-    Return a generator of the neighbours of a given vertex `vertex` in graph
-    `g`, where `g` is an adjacency matrix, `vertex` the corresponding index of
-    the vertex in the graph, and 0 is used to represent no connection between
-    two vertices in the adjacency matrix
+    Return a generator of `(neighbour, weight)` pairs for the neighbours of a
+    given vertex `vertex` in graph `g` that are not yet in the mst, where `g`
+    is an adjacency matrix (0 representing no connection between two vertices)
+    or a `CSRGraph`, and `vertex` the corresponding index of the vertex in the
+    graph
 
     '''
-    return (i for i in range(len(g)) if g[vertex][i] and not mst_set[i])
+    return ((i, weight) for i, weight in neighbours(g, vertex)
+            if not mst_set[i])
 
 
 def prim(g):
@@ -27,41 +35,77 @@ def prim(g):
     # mst and one containing vertices we have already added
     # We can in fact represent the "to add" set using a priority queue, as we
     # will always be interested in retrieving the minimum weight edge
-    to_add = []
-    mst_set = [False for _ in g]
+    to_add = IndexedHeap()
+    mst_set = [False for _ in xrange(len(g))]
     # minimum weight edges so far
-    # These will be added to the priority queue, and we will be updating the
-    # values of the minimum weight edge as the algorithm progresses, so we need
-    # to use a datatype that can reference items in the priority queue
-    # (e.g. list)
-    mwe = [[sys.maxint, i] for i in range(len(g))]
+    # We will be lowering the values of the minimum weight edge as the
+    # algorithm progresses, which the indexed heap can do in place
+    mwe = [sys.maxint for _ in xrange(len(g))]
     # To reconstruct the tree
-    parent = [None for _ in g]
+    parent = [None for _ in xrange(len(g))]
     # Initially we have to add all vertices to the set
-    for cost_and_vertex in mwe:
-        heapq.heappush(to_add, cost_and_vertex)
+    for vertex in xrange(len(g)):
+        to_add.push(vertex, mwe[vertex])
     while to_add:
         # next vertex of minimum weight edge
-        _, vertex = heapq.heappop(to_add)
+        _, vertex = to_add.pop()
         # Add the vertex to the mst set
         mst_set[vertex] = True
         # Update the minimum weight edges of the neighbours of this vertex
         # that have NOT been added to the mst
-        for neighbour in _gen_neighbours(vertex, g, mst_set):
-            if g[vertex][neighbour] < mwe[neighbour][0]:
+        for neighbour, weight in _gen_neighbours(vertex, g, mst_set):
+            if weight < mwe[neighbour]:
                 # the weigt of edge vertex->neighbour is lower cost than the
                 # current minimum
-                mwe[neighbour][0] = g[vertex][neighbour]
+                mwe[neighbour] = weight
                 parent[neighbour] = vertex
-        # maintain the heap invariant
-        heapq.heapify(to_add)
+                # maintain the heap invariant
+                to_add.decrease_key(neighbour, mwe[neighbour])
     # Return the edges and weights
     edges = []
     for i in range(len(parent)):
         if parent[i] is not None:
             par, child = parent[i], i
-            weight = g[par][child]
+            weight = mwe[child]
+            edges.append((weight, par, child))
+    return edges
+
+
+def lazy_prim(g):
+    '''
+    Prim's algorithm using "lazy deletion": rather than keeping one entry per
+    vertex in the priority queue and decreasing its key, every edge leaving
+    the mst is pushed onto a plain binary heap as it is found, and edges whose
+    other end has since been added to the mst are simply skipped when popped.
+    The heap may hold up to E edges, but each operation is a cheap O(log(E))
+    push or pop, and only the neighbours of each vertex are ever scanned, so
+    this is O(E log(E)) for a sparse `CSRGraph`.
+
+    g: adjacency matrix or `CSRGraph`. If the graph is disconnected, a minimum
+       spanning forest is returned
+
+    Returns: a list of edges `(weight, parent, child)`, as for `prim`
+
+    '''
+    mst_set = [False for _ in xrange(len(g))]
+    edges = []
+    for root in xrange(len(g)):
+        if mst_set[root]:
+            continue
+        # grow a tree from each vertex not yet reached
+        mst_set[root] = True
+        to_add = [(weight, root, neighbour)
+                  for neighbour, weight in _gen_neighbours(root, g, mst_set)]
+        heapq.heapify(to_add)
+        while to_add:
+            weight, par, child = heapq.heappop(to_add)
+            if mst_set[child]:
+                # a stale edge: `child` was added through a cheaper edge
+                continue
+            mst_set[child] = True
             edges.append((weight, par, child))
+            for neighbour, weight in _gen_neighbours(child, g, mst_set):
+                heapq.heappush(to_add, (weight, child, neighbour))
     return edges
 
 
@@ -74,6 +118,8 @@ def main():
     for edge in mst:
         print labels[edge[1]] + "->" + labels[edge[2]]
     print "MST Weight: {}".format(weight)
+    print "MST Weight (lazy): {}".format(
+        sum(edge[0] for edge in lazy_prim(adj_matrix)))
 
 
 if __name__ == '__main__':
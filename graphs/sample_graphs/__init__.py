@@ -10,3 +10,9 @@ g2_data = load.from_txt(os.path.join(_sample_graphs_dir,
 
 g3_data = load.from_txt(os.path.join(_sample_graphs_dir,
                                      "g3.txt"))
+
+g4_data = load.from_txt(os.path.join(_sample_graphs_dir,
+                                     "g4.txt"))
+
+g5_data = load.from_txt(os.path.join(_sample_graphs_dir,
+                                     "g5.txt"))
@@ -1,11 +1,23 @@
+import cPickle as pickle
+import os
+import sys
+from array import array
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from csr import CSRGraph, EdgeList
+
+
 def _parse_adjacency_list(edge_lst):
     '''
-    `edge_lst` is a list of strings, where each string begins with a node
+    `edge_lst` is an iterable of strings, where each string begins with a node
     '<node>: ', and is followed by a comma separated list of the nodes
     it is adjacent to in the graph.
     '''
     graph = {}
     for edges in edge_lst:
+        if not edges:
+            continue
         node, neighbours = edges.split(": ")
         neighbours = neighbours.split(",")
         graph[node] = set(neighbours)
@@ -14,36 +26,182 @@ def _parse_adjacency_list(edge_lst):
 
 def _parse_adjacency_matrix(edge_lst):
     '''
-    `edge_lst` is a list of strings, where each string begins with a node
+    `edge_lst` is an iterable of strings, where each string begins with a node
     '<node>: ', and is followed by a comma separated list of weights for the
     edge connecting it to every other node in the graph. A weight of 0 means
-    there is no connection between two nodes.
+    there is no connection between two nodes. The matrix ends at the first
+    empty string.
+
+    Each row of the matrix is an array of integers, which is indexed just like
+    a list but takes a fraction of the memory.
     '''
-    graph = [[None for _ in edge_lst] for _ in edge_lst]
-    labels = [None for _ in edge_lst]
-    for i in xrange(len(edge_lst)):
-        node, weights = edge_lst[i].split(": ")
-        weights = weights.split(",")
-        for j in xrange(len(weights)):
-            graph[i][j] = int(weights[j])
-        labels[i] = node
+    graph = []
+    labels = []
+    for line in edge_lst:
+        if not line:
+            break
+        node, weights = line.split(": ")
+        graph.append(array('l', map(int, weights.split(","))))
+        labels.append(node)
     return graph, labels
 
+
+def _parse_sparse_adjacency_list(edge_lst):
+    '''
+    `edge_lst` is an iterable of strings, where each string begins with a node
+    '<node>:', and is followed by a comma separated list of
+    '<neighbour> <weight>' pairs, one for every edge leaving the node. Nodes
+    without any outgoing edges still need their own (empty) line.
+
+    Returns a `CSRGraph` and the labels of its vertices.
+    '''
+    labels = []
+    # edges are read before we know the index of every neighbour, so keep
+    # the neighbour labels and look up their indices at the end
+    edges = []
+    for line in edge_lst:
+        if not line:
+            continue
+        node, neighbours = line.split(":", 1)
+        i = len(labels)
+        labels.append(node)
+        neighbours = neighbours.strip()
+        if not neighbours:
+            continue
+        for pair in neighbours.split(","):
+            neighbour, weight = pair.split()
+            weight = float(weight) if "." in weight else int(weight)
+            edges.append((i, neighbour, weight))
+    index = {label: i for i, label in enumerate(labels)}
+    edges = [(i, index[neighbour], weight) for i, neighbour, weight in edges]
+    return CSRGraph.from_edges(len(labels), edges), labels
+
+
+def _parse_edge_list(edge_lst):
+    '''
+    `edge_lst` is an iterable of strings of the form '<node> <node> <weight>',
+    one for each edge of the graph, or just '<node>' to declare a node without
+    any edges. Nodes are numbered in the order they first appear.
+
+    Returns an `EdgeList` and the labels of its vertices.
+    '''
+    labels = []
+    index = {}
+    sources, targets, weights = array('l'), array('l'), []
+    for line in edge_lst:
+        if not line:
+            continue
+        fields = line.split()
+        for label in fields[:2]:
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+        if len(fields) == 1:
+            continue
+        sources.append(index[fields[0]])
+        targets.append(index[fields[1]])
+        weight = fields[2]
+        weights.append(float(weight) if "." in weight else int(weight))
+    typecode = 'd' if any(isinstance(w, float) for w in weights) else 'l'
+    return (EdgeList(len(labels), sources, targets, array(typecode, weights)),
+            labels)
+
+
 def _parse_adjacency_matrix_with_heuristic(edge_lst):
-    split_idx = edge_lst.index("EUCLIDEAN_COORDS:")
-    edge_lst, heuristic = edge_lst[:split_idx-1], edge_lst[split_idx+1:]
+    edge_lst = iter(edge_lst)
+    # the matrix is followed by an empty line
     graph, labels = _parse_adjacency_matrix(edge_lst)
-    coords = [map(float, s.split(': ')[-1].split(',')) for s in heuristic]
+    for line in edge_lst:
+        if line == "EUCLIDEAN_COORDS:":
+            break
+    coords = [map(float, s.split(': ')[-1].split(','))
+              for s in edge_lst if s]
     return graph, labels, coords
 
 
-def from_txt(filepath):
+def _cache_path(filepath):
+    return filepath + ".cache"
+
+
+def _write_cache(filepath, format, data):
+    '''
+    Save the parsed `data` of the graph file `filepath` next to it, as a
+    header (including the modification time of `filepath`) followed by the
+    raw contents of the arrays in `data`
+    '''
+    if format == "SPARSE_ADJACENCY_LIST":
+        graph, labels = data
+        arrays = [graph.offsets, graph.targets, graph.weights]
+        extra = None
+    elif format == "EDGE_LIST":
+        graph, labels = data
+        arrays = [graph.sources, graph.targets, graph.weights]
+        extra = len(graph)
+    else:
+        graph, labels = data[:2]
+        arrays = graph
+        # coordinates, for ADJACENCY_MATRIX_WITH_HEURISTIC
+        extra = data[2:]
+    header = dict(mtime=os.path.getmtime(filepath),
+                  format=format,
+                  labels=labels,
+                  extra=extra,
+                  arrays=[(a.typecode, len(a)) for a in arrays])
+    try:
+        with open(_cache_path(filepath), 'wb') as f:
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            for a in arrays:
+                a.tofile(f)
+    except IOError:
+        # the cache is only an optimization, e.g. the directory may be
+        # read only
+        pass
+
+
+def _read_cache(filepath):
+    '''
+    Return the data saved by `_write_cache` for `filepath`, or None if there
+    is no cache or `filepath` has been modified since it was written
+    '''
+    try:
+        with open(_cache_path(filepath), 'rb') as f:
+            header = pickle.load(f)
+            if header['mtime'] != os.path.getmtime(filepath):
+                return None
+            arrays = []
+            for typecode, length in header['arrays']:
+                a = array(typecode)
+                a.fromfile(f, length)
+                arrays.append(a)
+    except (IOError, EOFError, pickle.UnpicklingError):
+        return None
+    if header['format'] == "SPARSE_ADJACENCY_LIST":
+        return CSRGraph(*arrays), header['labels']
+    if header['format'] == "EDGE_LIST":
+        return EdgeList(header['extra'], *arrays), header['labels']
+    return (arrays, header['labels']) + tuple(header['extra'])
+
+
+def from_txt(filepath, cache=False):
     '''
     Read a graph from a text file of a suitable format and return it in the
     specified format.
+
+    The file is read one line at a time, so only the parsed graph (and not
+    the text of the file) needs to fit in memory.
+
+    If `cache` is True, the parsed adjacency matrices, sparse adjacency lists
+    and edge lists are also saved in binary form to `<filepath>.cache`, which
+    is then read instead of `filepath` on later calls, for as long as
+    `filepath` is not modified.
     '''
     format = None
-    graph = None
+    data = None
+
+    if cache:
+        data = _read_cache(filepath)
+        if data is not None:
+            return data
 
     with open(filepath, 'rb') as f:
         line = f.readline()
@@ -53,21 +211,23 @@ def from_txt(filepath):
         format = line.split("FORMAT: ")[1].strip()
         while "GRAPH" not in line:
             line = f.readline()
-        # next line starts the graph declaration
-        graph = map(lambda l: l.strip(), f.readlines())
-
-    # remove any trailing empty lines
-    while not graph[-1]:
-        del(graph[-1])
-
-    if format == "ADJACENCY_LIST":
-        data = _parse_adjacency_list(graph)
-    elif format == "ADJACENCY_MATRIX":
-        data = _parse_adjacency_matrix(graph)
-    elif format == "ADJACENCY_MATRIX_WITH_HEURISTIC":
-        data = _parse_adjacency_matrix_with_heuristic(graph)
-    else:
-        return ValueError("Unrecognized format")
+        # the remaining lines are the graph declaration
+        graph = (l.strip() for l in f)
 
-    return data
+        if format == "ADJACENCY_LIST":
+            data = _parse_adjacency_list(graph)
+        elif format == "ADJACENCY_MATRIX":
+            data = _parse_adjacency_matrix(graph)
+        elif format == "ADJACENCY_MATRIX_WITH_HEURISTIC":
+            data = _parse_adjacency_matrix_with_heuristic(graph)
+        elif format == "SPARSE_ADJACENCY_LIST":
+            data = _parse_sparse_adjacency_list(graph)
+        elif format == "EDGE_LIST":
+            data = _parse_edge_list(graph)
+        else:
+            raise ValueError("Unrecognized format")
 
+    if cache and format != "ADJACENCY_LIST":
+        _write_cache(filepath, format, data)
+
+    return data
@@ -1,3 +1,11 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir))
+from CSPs.csp import CSP
+
+
 def vertex_coloring(graph, m):
     '''
     Try to color the vertices of the graph `graph` using `m` colors so that no
@@ -8,50 +16,28 @@ def vertex_coloring(graph, m):
     the nodes in the graph, and the values are sets containing the adjacent
     nodes in the graph.
 
+    This is solved as a CSP with a variable for each vertex, whose domain is
+    the colors 1, 2, ..., m, and a "different" constraint for each edge. The
+    CSP solver assigns first to the vertices with the fewest colors left (and
+    then the most uncolored neighbours), and keeps the remaining vertices arc
+    consistent, so it fails much sooner than coloring in an arbitrary order.
+
     '''
-    # available colors
-    colors = set(range(1, m+1))
-    # Store the colors of each vertex
-    # 0 will indicate no color, and 1, 2, ..., m will represent the colors
-    color_dict = {}
-    for node in graph:
-        color_dict[node] = 0
-
-    # attempt to color the vertices in an arbitrary order
     vertices = graph.keys()
-
-    def _color_vertex(graph, color_dict, vertices, idx):
-        '''
-        Check if there is a way to color the `graph` using vertices that have
-        already been successfully colored in `color_dict`, considering the
-        vertex at `vertices[idx]`
-
-        Coloring is done in the order of `vertices`, so we are done when `idx`
-        is equal to the length of `vertices`.
-
-        '''
-        if idx == len(vertices):
-            # We have colored all vertices
-            return color_dict
-        # current vertex
-        vertex = vertices[idx]
-        # We try to color the next vertex
-        used_colors = set(color_dict[neighbour] for neighbour in graph[vertex]
-                          if color_dict[neighbour])
-        available_colors = colors.difference(used_colors)
-        for color in available_colors:
-            color_dict[vertex] = color
-            coloring = _color_vertex(graph, color_dict, vertices, idx+1)
-            if coloring is not None:
-                return coloring
-            # a coloring was not possible with this choice, try next color
-            continue
-        # we were not able to color the vertex, backtrack
-        color_dict[vertex] = 0
+    index = {vertex: i for i, vertex in enumerate(vertices)}
+    # bit c is set if color c is available
+    colors = sum(1 << c for c in range(1, m+1))
+    problem = CSP([colors] * len(vertices))
+    for vertex in vertices:
+        if vertex in graph[vertex]:
+            # a vertex adjacent to itself can never be colored
+            return None
+        for neighbour in graph[vertex]:
+            problem.add_different(index[vertex], index[neighbour])
+    coloring = problem.solve()
+    if coloring is None:
         return None
-
-    # Start the coloring from `vertices[0]`
-    return _color_vertex(graph, color_dict, vertices, 0)
+    return dict(zip(vertices, coloring))
 
 
 def main():